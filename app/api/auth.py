@@ -1,59 +1,52 @@
 import logging
-import os
 from datetime import timedelta
-from dotenv import load_dotenv
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
-from passlib.context import CryptContext
 from starlette import status
 from app.schemas.user import CreateUserRequest
 from app.schemas.accessToken import Token, TokenData
 
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
-from app.database.session import get_db
-from app.utils import authenticate_user, create_access_token, decode_token
-
-if os.getenv("ENVIRONMENT") == "development":
-    load_dotenv()
-
+from app.database.session import get_async_db
+from app.services import password_hasher, token_revocations
+from app.settings import settings
+from app.utils import TokenRevoked, authenticate_user, create_access_token, decode_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="/auth/token/")
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
+# Async session: these routes await bcrypt, and a sync connection held across
+# that await can starve the pool while the event loop blocks on checkout.
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
 
 
 # --------------------------------------------------------------------------------------
 @router.post("/create_user/", status_code=status.HTTP_201_CREATED)
 async def create_user(db: db_dependency, new_user: CreateUserRequest):
 
-    hashed_password = bcrypt_context.hash(new_user.password)
     existing_user = (
-        db.query(User)
-        .filter(
-            or_(
-                User.user_matric == new_user.user_matric,
-                User.email == new_user.email,
+        await db.execute(
+            select(User.id).where(
+                or_(
+                    User.user_matric == new_user.user_matric,
+                    User.email == new_user.email,
+                )
             )
         )
-        .first()
-    )
+    ).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="ID number/Email account already exists. Login?",
         )
+    hashed_password = await password_hasher.hash(new_user.password)
     try:
 
         new_user = User(
@@ -65,12 +58,11 @@ async def create_user(db: db_dependency, new_user: CreateUserRequest):
         )
 
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
 
         return {"message": "User created successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         # Capture any other generic exceptions for better error handling
         logging.error(f"General error: {e}")
         raise HTTPException(
@@ -85,21 +77,22 @@ async def login_for_access_token(
 ):
 
     existing_user = (
-        db.query(User)
-        .filter(
-            or_(
-                User.email == form_data.username, User.user_matric == form_data.username
+        await db.execute(
+            select(User).where(
+                or_(
+                    User.email == form_data.username,
+                    User.user_matric == form_data.username,
+                )
             )
         )
-        .first()
-    )
+    ).scalars().first()
 
     if not existing_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not registered yet"
         )
 
-    authenticated_user = authenticate_user(form_data.username, form_data.password, db)
+    authenticated_user = await authenticate_user(existing_user, form_data.password, db)
     if not authenticated_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -111,14 +104,20 @@ async def login_for_access_token(
         authenticated_user.username,
         authenticated_user.role,
         authenticated_user.user_matric,
-        timedelta(minutes=20),
+        timedelta(minutes=settings.access_token_minutes),
     )
     return {"access_token": token, "token_type": "bearer"}
 
 
 
 def get_current_user(token: str = Depends(oauth2_bearer)):
-    return decode_token(token)
+    # Counted here rather than in decode_token, which the middleware also
+    # calls for the same request
+    try:
+        return decode_token(token)
+    except TokenRevoked:
+        token_revocations.rejected += 1
+        raise
 
 
 def get_current_admin_user(current_user: TokenData = Depends(get_current_user)):
@@ -135,3 +134,22 @@ def get_current_student_user(current_user: TokenData = Depends(get_current_user)
             status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
         )
     return current_user
+
+
+@router.post("/logout/")
+async def logout(db: db_dependency, user: Annotated[dict, Depends(get_current_user)]):
+    """Revokes every token issued to the caller so far."""
+    await token_revocations.revoke(db, user["user_matric"])
+    return {"message": "Logged out"}
+
+
+@router.post("/revoke_user/")
+async def revoke_user(
+    user_matric: str,
+    db: db_dependency,
+    _: Annotated[dict, Depends(get_current_admin_user)],
+):
+    """Admin endpoint: revokes every token issued to a user so far, e.g. after
+    their account is compromised. They can log in again afterwards."""
+    await token_revocations.revoke(db, user_matric)
+    return {"message": f"Tokens of {user_matric} revoked"}
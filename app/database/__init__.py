@@ -1,2 +1,17 @@
 # app/database/__init__.py
-from .session import Base, get_db, engine, SessionLocal
+from .session import (
+    Base,
+    get_db,
+    engine,
+    SessionLocal,
+    get_async_db,
+    async_engine,
+    AsyncSessionLocal,
+)
+from .replicas import (
+    replica_set,
+    get_read_db,
+    get_async_read_db,
+    read_sessionmaker,
+    async_read_sessionmaker,
+)
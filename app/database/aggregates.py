@@ -0,0 +1,20 @@
+"""Rebuilds the attendance aggregate tables from AttendanceRecords.
+
+    python -m app.database.aggregates
+
+The tables are kept current on every check-in; run this after editing or
+deleting attendance records directly, or if the two ever drift apart.
+"""
+
+from app.database.session import engine
+from app.services.attendanceAggregates import rebuild_aggregates
+
+
+def rebuild(bind=engine):
+    with bind.begin() as conn:
+        rebuild_aggregates(conn)
+
+
+if __name__ == "__main__":
+    rebuild()
+    print("Attendance aggregates rebuilt")
@@ -0,0 +1,74 @@
+"""Applies pending migrations from app/database/migrations.
+
+    python -m app.database.migrate            # upgrade to latest
+    python -m app.database.migrate --down NAME # roll back one migration
+"""
+
+import argparse
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+
+from app.database import migrations
+from app.database.session import engine
+
+metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("name", String(100), primary_key=True),
+    Column("applied_at", DateTime),
+)
+
+
+def available_migrations():
+    return sorted(module.name for module in pkgutil.iter_modules(migrations.__path__))
+
+
+def applied_migrations(conn):
+    metadata.create_all(conn, tables=[schema_migrations])
+    return set(conn.scalars(select(schema_migrations.c.name)))
+
+
+def upgrade(bind=engine):
+    applied = []
+    with bind.begin() as conn:
+        done = applied_migrations(conn)
+    for name in available_migrations():
+        if name in done:
+            continue
+        module = importlib.import_module(f"{migrations.__name__}.{name}")
+        with bind.begin() as conn:
+            migrations.upgrade(module, conn)
+            conn.execute(
+                schema_migrations.insert().values(name=name, applied_at=datetime.utcnow())
+            )
+        applied.append(name)
+    return applied
+
+
+def downgrade(name, bind=engine):
+    module = importlib.import_module(f"{migrations.__name__}.{name}")
+    with bind.begin() as conn:
+        if name not in applied_migrations(conn):
+            raise ValueError(f"Migration {name} has not been applied")
+        migrations.downgrade(module, conn)
+        conn.execute(schema_migrations.delete().where(schema_migrations.c.name == name))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--down", metavar="NAME", help="roll back a single migration")
+    args = parser.parse_args()
+
+    if args.down:
+        downgrade(args.down)
+        print(f"Rolled back {args.down}")
+    else:
+        applied = upgrade()
+        for name in applied:
+            print(f"Applied {name}")
+        if not applied:
+            print("Database is up to date")
@@ -0,0 +1,29 @@
+# Each module here is one migration, applied in name order by app/database/migrate.py.
+# A migration exposes upgrade(conn) and downgrade(conn), both run inside a transaction,
+# or, if it only adds indexes, just INDEXES: {table name: [(index name, [columns])]}.
+
+from sqlalchemy import Index, MetaData, Table
+
+
+def _indexes(conn, indexes):
+    metadata = MetaData()
+    for table_name, table_indexes in indexes.items():
+        table = Table(table_name, metadata, autoload_with=conn)
+        for index_name, columns in table_indexes:
+            yield Index(index_name, *(table.c[column] for column in columns))
+
+
+def upgrade(migration, conn):
+    if hasattr(migration, "upgrade"):
+        migration.upgrade(conn)
+        return
+    for index in _indexes(conn, migration.INDEXES):
+        index.create(conn, checkfirst=True)
+
+
+def downgrade(migration, conn):
+    if hasattr(migration, "downgrade"):
+        migration.downgrade(conn)
+        return
+    for index in _indexes(conn, migration.INDEXES):
+        index.drop(conn, checkfirst=True)
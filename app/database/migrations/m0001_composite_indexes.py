@@ -0,0 +1,13 @@
+"""Composite indexes backing the range-based day filters."""
+
+INDEXES = {
+    "Geofences": [
+        ("ix_geofences_name_start_time", ["name", "start_time"]),
+        ("ix_geofences_creator_matric_start_time", ["creator_matric", "start_time"]),
+    ],
+    "AttendanceRecords": [
+        ("ix_attendance_geofence_name_timestamp", ["geofence_name", "timestamp"]),
+        ("ix_attendance_user_matric_fence_code", ["user_matric", "fence_code"]),
+    ],
+}
+
@@ -0,0 +1,12 @@
+"""Indexes matching the newest-first ORDER BY of the paginated listings."""
+
+INDEXES = {
+    "Geofences": [
+        ("ix_geofences_time_created", ["time_created", "id"]),
+        ("ix_geofences_creator_matric_time_created", ["creator_matric", "time_created"]),
+    ],
+    "AttendanceRecords": [
+        ("ix_attendance_user_matric_timestamp", ["user_matric", "timestamp"]),
+    ],
+}
+
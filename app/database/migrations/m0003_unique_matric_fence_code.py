@@ -0,0 +1,41 @@
+"""Makes AttendanceRecords.matric_fence_code unique so double check-ins fail on insert.
+
+Duplicates recorded before the constraint existed are removed first, keeping
+the earliest row (lowest id) for each key. Downgrade drops the index only; the
+removed duplicates are not restored.
+"""
+
+import logging
+
+from sqlalchemy import Index, MetaData, Table, delete, func, select
+
+INDEX_NAME = "uq_attendance_matric_fence_code"
+
+
+def _table(conn):
+    return Table("AttendanceRecords", MetaData(), autoload_with=conn)
+
+
+def upgrade(conn):
+    records = _table(conn)
+    # Derived table, since MySQL won't delete from a table it also selects from
+    keep = (
+        select(func.min(records.c.id).label("id"))
+        .where(records.c.matric_fence_code.is_not(None))
+        .group_by(records.c.matric_fence_code)
+        .subquery("keep")
+    )
+    removed = conn.execute(
+        delete(records).where(
+            records.c.matric_fence_code.is_not(None),
+            records.c.id.not_in(select(keep.c.id)),
+        )
+    ).rowcount
+    if removed:
+        logging.warning("Removed %d duplicate attendance records", removed)
+    Index(INDEX_NAME, records.c.matric_fence_code, unique=True).create(conn, checkfirst=True)
+
+
+def downgrade(conn):
+    records = _table(conn)
+    Index(INDEX_NAME, records.c.matric_fence_code, unique=True).drop(conn, checkfirst=True)
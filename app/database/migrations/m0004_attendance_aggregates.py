@@ -0,0 +1,17 @@
+"""Aggregate tables behind the analytics endpoint, backfilled from existing records."""
+
+from app.models.attendanceAggregate import CourseSessionAttendance, CourseStudentAttendance
+from app.services.attendanceAggregates import rebuild_aggregates
+
+TABLES = [CourseSessionAttendance.__table__, CourseStudentAttendance.__table__]
+
+
+def upgrade(conn):
+    for table in TABLES:
+        table.create(conn, checkfirst=True)
+    rebuild_aggregates(conn)
+
+
+def downgrade(conn):
+    for table in TABLES:
+        table.drop(conn, checkfirst=True)
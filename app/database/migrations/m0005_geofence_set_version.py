@@ -0,0 +1,17 @@
+"""Shared version row behind the geofence listing ETags."""
+
+from sqlalchemy import insert, select
+
+from app.models.geofenceSetVersion import GeofenceSetVersion
+
+TABLE = GeofenceSetVersion.__table__
+
+
+def upgrade(conn):
+    TABLE.create(conn, checkfirst=True)
+    if conn.scalar(select(TABLE.c.id).where(TABLE.c.id == 1)) is None:
+        conn.execute(insert(TABLE).values(id=1, version=0))
+
+
+def downgrade(conn):
+    TABLE.drop(conn, checkfirst=True)
@@ -0,0 +1,13 @@
+"""Per-user token revocation cutoffs, read by every worker's TokenRevocations."""
+
+from app.models.tokenRevocation import TokenRevocation
+
+TABLE = TokenRevocation.__table__
+
+
+def upgrade(conn):
+    TABLE.create(conn, checkfirst=True)
+
+
+def downgrade(conn):
+    TABLE.drop(conn, checkfirst=True)
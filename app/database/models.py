@@ -2,3 +2,6 @@
 from app.models.user import User
 from app.models.geofence import Geofence 
 from app.models.attendanceRecord import AttendanceRecord  # Adjust the import based on your directory structure
+from app.models.attendanceAggregate import CourseSessionAttendance, CourseStudentAttendance
+from app.models.geofenceSetVersion import GeofenceSetVersion
+from app.models.tokenRevocation import TokenRevocation
@@ -0,0 +1,239 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.session import (
+    AsyncSessionLocal,
+    SessionLocal,
+    TimedAsyncQueuePool,
+    sync_pool_options,
+    to_async_url,
+)
+from app.settings import settings
+
+
+class Replica:
+    """Sync and async engines for one read replica, plus its health."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = make_url(url)
+        self.engine = create_engine(url, **sync_pool_options(url))
+        self.async_engine = create_async_engine(
+            to_async_url(url),
+            poolclass=TimedAsyncQueuePool,
+            pool_size=settings.async_db_pool_size,
+            max_overflow=settings.async_db_max_overflow,
+        )
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.AsyncSessionLocal = async_sessionmaker(
+            bind=self.async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        self.healthy = True
+        self.reads = 0
+        self.failures = 0
+        for engine in (self.engine, self.async_engine.sync_engine):
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        # A dropped or refused connection takes the replica out of rotation
+        # until the next successful health check.
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            self.mark_down(context.original_exception)
+
+    def mark_down(self, reason):
+        if self.healthy:
+            logging.warning(f"Read replica {self.name} marked down: {reason}")
+            self.failures += 1
+        self.healthy = False
+
+    def mark_up(self):
+        if not self.healthy:
+            logging.info(f"Read replica {self.name} is healthy again")
+        self.healthy = True
+
+    async def ping(self, timeout: float):
+        async with self.async_engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout)
+
+    async def dispose(self):
+        self.engine.dispose()
+        await self.async_engine.dispose()
+
+
+class ReplicaSet:
+    """Routes reads across healthy replicas round-robin, falling back to the
+    primary when there are none or when the user wrote within the last
+    `pin_seconds` (read-your-writes).
+
+    Replicas are marked down on connection errors and re-probed every
+    `health_check_interval` seconds. Pins are per worker, so a client whose
+    write and read land on different workers can still see replica lag.
+    """
+
+    def __init__(self, replicas: list[Replica], health_check_interval: float = 5, pin_seconds: float = 5):
+        self.replicas = replicas
+        self.health_check_interval = health_check_interval
+        self.pin_seconds = pin_seconds
+        self.primary_reads = 0
+        self.pinned_reads = 0
+        self._next = itertools.count()
+        # Dependencies run in the threadpool; writes are recorded on the event loop
+        self._lock = threading.Lock()
+        self._pinned: dict[str, float] = {}
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def pick(self, user_matric: Optional[str] = None) -> Optional[Replica]:
+        """Replica to read from, or None to read from the primary."""
+        if user_matric is not None and self.is_pinned(user_matric):
+            self.pinned_reads += 1
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            self.primary_reads += 1
+            return None
+        replica = healthy[next(self._next) % len(healthy)]
+        replica.reads += 1
+        return replica
+
+    def record_write(self, user_matric: str):
+        if self.pin_seconds <= 0 or not self.replicas:
+            return
+        with self._lock:
+            self._pinned[user_matric] = time.monotonic() + self.pin_seconds
+
+    def is_pinned(self, user_matric: str):
+        with self._lock:
+            until = self._pinned.get(user_matric)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._pinned[user_matric]
+                return False
+            return True
+
+    def _prune_pins(self):
+        now = time.monotonic()
+        with self._lock:
+            for user_matric in [user for user, until in self._pinned.items() if until <= now]:
+                del self._pinned[user_matric]
+
+    async def check(self):
+        """Pings every replica and marks it up or down accordingly."""
+        for replica in self.replicas:
+            try:
+                await replica.ping(timeout=self.health_check_interval)
+            except Exception as e:
+                replica.mark_down(e)
+            else:
+                replica.mark_up()
+
+    async def start(self):
+        if not self.replicas:
+            return
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        for replica in self.replicas:
+            await replica.dispose()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.check()
+            self._prune_pins()
+
+    def stats(self):
+        with self._lock:
+            pinned_users = len(self._pinned)
+        return {
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "database": replica.url.render_as_string(hide_password=True),
+                    "healthy": replica.healthy,
+                    "reads": replica.reads,
+                    "failures": replica.failures,
+                }
+                for replica in self.replicas
+            ],
+            "primary_reads": self.primary_reads,
+            "pinned_reads": self.pinned_reads,
+            "pinned_users": pinned_users,
+            "pin_seconds": self.pin_seconds,
+        }
+
+    def render(self):
+        """Prometheus exposition lines, labelled by replica."""
+        lines = [
+            "# HELP db_replica_up Whether a read replica is in rotation.",
+            "# TYPE db_replica_up gauge",
+        ]
+        lines += [f'db_replica_up{{replica="{r.name}"}} {int(r.healthy)}' for r in self.replicas]
+        lines += [
+            "# HELP db_reads_total Read sessions opened, by target.",
+            "# TYPE db_reads_total counter",
+        ]
+        lines += [f'db_reads_total{{target="{r.name}"}} {r.reads}' for r in self.replicas]
+        lines.append(f'db_reads_total{{target="primary"}} {self.primary_reads}')
+        lines.append(f'db_reads_total{{target="primary_pinned"}} {self.pinned_reads}')
+        return lines
+
+
+replica_set = ReplicaSet(
+    [Replica(f"replica{i}", url) for i, url in enumerate(settings.db_replica_urls)],
+    health_check_interval=settings.replica_health_check_interval,
+    pin_seconds=settings.read_your_writes_seconds,
+)
+
+
+def request_user_matric(request: Request) -> Optional[str]:
+    # Set by ReadYourWritesMiddleware from the request's bearer token
+    return getattr(request.state, "user_matric", None)
+
+
+def read_sessionmaker(user_matric: Optional[str] = None):
+    """Session factory of a healthy replica, or of the primary."""
+    replica = replica_set.pick(user_matric)
+    return replica.SessionLocal if replica else SessionLocal
+
+
+def async_read_sessionmaker(user_matric: Optional[str] = None):
+    replica = replica_set.pick(user_matric)
+    return replica.AsyncSessionLocal if replica else AsyncSessionLocal
+
+
+def get_read_db(request: Request):
+    """Session for read-only routes, which can tolerate replica lag."""
+    db = read_sessionmaker(request_user_matric(request))()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    async with async_read_sessionmaker(request_user_matric(request))() as db:
+        yield db
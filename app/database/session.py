@@ -1,18 +1,51 @@
-import os
-from dotenv import load_dotenv
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-# Load environment variables if in development
-if os.getenv("ENVIRONMENT") == "development":
-    load_dotenv()
+from app.settings import settings
+
+SQLALCHEMY_DATABASE_URL = settings.db_url
+
+
+class TimedPoolMixin:
+    """Counts checkouts and the time spent waiting for a free connection."""
+
+    checkouts = 0
+    wait_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.checkouts += 1
+            self.wait_seconds += time.perf_counter() - start
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def sync_pool_options(url):
+    # In-memory SQLite needs its own single-connection pool
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {"poolclass": TimedQueuePool}
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DB_URL_STRING")
 
 # Create SQLAlchemy engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
+    **sync_pool_options(SQLALCHEMY_DATABASE_URL),
     # connect_args={
     #         "ssl": {
     #             "ca": "./ca.pem",  
@@ -23,6 +56,42 @@ engine = create_engine(
 # Create a configured "Session" class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers to swap in for the sync ones in DB_URL_STRING
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url):
+    """Returns the async-driver equivalent of a sync database url."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+# Async engine used by the hot routes (check-in, listings). Points at the same
+# database as the sync engine unless ASYNC_DB_URL_STRING overrides it.
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.async_db_url or to_async_url(
+    SQLALCHEMY_DATABASE_URL
+)
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    # Explicit so aiosqlite doesn't fall back to NullPool (new connection per request)
+    poolclass=TimedAsyncQueuePool,
+    pool_size=settings.async_db_pool_size,
+    max_overflow=settings.async_db_max_overflow,
+)
+
+# expire_on_commit=False so rows can still be read (and serialized) after commit
+# without another round trip.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # Declare a base class for your ORM models
 Base = declarative_base()
 
@@ -34,3 +103,6 @@ def get_db():
         db.close()  # Close the session when done
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
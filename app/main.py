@@ -1,63 +1,106 @@
-import math
+import csv
+import io
+import json
+import logging
 import random
 import string
-from datetime import datetime
-import os
-from typing import Annotated, Optional
+from contextlib import asynccontextmanager
+from datetime import date as date_type, datetime, timedelta
+from typing import Annotated, Literal, Optional
 from zoneinfo import ZoneInfo
 
-from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from icecream import ic
-from mysql.connector import errors
-
-from passlib.context import CryptContext
-
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 import app.api.auth as auth
 from app.api.auth import (
     get_current_admin_user,
     get_current_student_user,
     get_current_user,
 )
-from app.schemas.geofence import GeofenceCreate
+from app.utils import (
+    attachment,
+    day_range,
+    decode_token,
+    etag_matches,
+    finish_page,
+    haversine,
+    is_duplicate_entry,
+    keyset_page,
+)
+from app.schemas.geofence import GeofenceCreate, GeofenceList, GeofenceOut
+from app.schemas.attendanceRecord import (
+    AttendanceRecordOut,
+    AttendanceSummary,
+    BatchCheckInRequest,
+)
 
-from sqlalchemy import func
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.session import SessionLocal
+from app.database.session import (
+    AsyncSessionLocal,
+    async_engine,
+    engine,
+    get_async_db,
+    get_db,
+)
+from app.database.replicas import (
+    async_read_sessionmaker,
+    get_async_read_db,
+    get_read_db,
+    replica_set,
+)
+from app.middleware import (
+    AdmissionControlMiddleware,
+    QueryProfilerMiddleware,
+    ReadYourWritesMiddleware,
+    RequestMetricsMiddleware,
+    admission_control,
+    metrics,
+    query_profiler,
+)
 from app.models.user import User
 from app.models.geofence import Geofence
 from app.models.attendanceRecord import AttendanceRecord
-
-
-if os.getenv("ENVIRONMENT") == "development":
-    load_dotenv()
-
-
-def get_db():
-    db = SessionLocal()  # Create a new session
-    try:
-        yield db  # Yield the session to be used
-    finally:
-        db.close()  # Close the session when done
+from app.models.attendanceAggregate import (
+    CourseSessionAttendance,
+    CourseStudentAttendance,
+)
+from app.services import (
+    active_fences,
+    active_geofences,
+    attendance_feed,
+    attendance_writer,
+    check_in_registry,
+    record_check_ins,
+    geofence_scheduler,
+    geofence_version,
+    password_hasher,
+    shared_fences,
+    token_cache,
+    token_revocations,
+    utc_naive,
+    utc_now,
+    within_radius,
+    FeedFull,
+    WriteBehindFull,
+)
+from app.settings import settings
 
 
 # ----------------------------------------Geolocation Logic/Algorithm--------------------------------------------
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Earth radius in km
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = (
-        math.sin(dphi / 2) ** 2
-        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    )
-    return (
-        2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a)) * 1000
-    )  # Convert to meters
-
-
-def check_user_in_circular_geofence(user_lat, user_lng, geofence: Geofence):
+def check_user_in_circular_geofence(user_lat, user_lng, geofence):
     latitude = geofence.latitude
     longitude = geofence.longitude
     radius = geofence.radius
@@ -65,36 +108,159 @@ def check_user_in_circular_geofence(user_lat, user_lng, geofence: Geofence):
     return distance <= radius
 
 
+def on_geofence_change(fence_code: str, status: Optional[str] = None):
+    """Drops this worker's in-process views of a geofence after it changes,
+    and has the owner of the node's shared fence table reload it."""
+    shared_fences.mark_dirty()
+    active_geofences.invalidate(fence_code)
+    if status == "inactive":
+        active_fences.remove(fence_code)
+        check_in_registry.discard(fence_code)
+        attendance_feed.close(fence_code)
+    else:
+        active_fences.invalidate()
+
+
+def on_check_ins_dropped(records: list[dict]):
+    """Lets students retry check-ins the write-behind queue accepted but could
+    not store."""
+    for record in records:
+        check_in_registry.remove(record["fence_code"], record["user_matric"])
+
+
 def generate_alphanumeric_code(length=6):
     characters = string.ascii_letters + string.digits
     return "".join(random.choice(characters) for _ in range(length))
 
 
-# ----------------------------------------Password Hashing--------------------------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # ----------------------------------------Allowed Origins--------------------------------------------
 origins = [
     "http://localhost:3000",
     "http://localhost",
 ]
 # ----------------------------------------FastAPI App Init--------------------------------------------
-app = FastAPI()
+geofence_scheduler.add_listener(on_geofence_change)
+attendance_writer.add_drop_listener(on_check_ins_dropped)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    attendance_writer.start()
+    await geofence_scheduler.start()
+    await token_revocations.start()
+    await replica_set.start()
+    if settings.shared_fence_table:
+        await shared_fences.start()
+    yield
+    await shared_fences.stop()
+    await replica_set.stop()
+    await token_revocations.stop()
+    await geofence_scheduler.stop()
+    await attendance_writer.stop()
+    await async_engine.dispose()
+    password_hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# Innermost of the middleware, so shed requests still get CORS headers and are
+# counted by the metrics and profiler middleware
+if settings.admission_control:
+    app.add_middleware(AdmissionControlMiddleware)
+if replica_set.replicas:
+    app.add_middleware(ReadYourWritesMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Just for Development. Would be changed later.
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Retry-After"],
 )
+app.add_middleware(RequestMetricsMiddleware)
+if settings.query_profiler:
+    app.add_middleware(QueryProfilerMiddleware)
 app.include_router(auth.router)
 
 
 # ----------------------------------------Dependencies--------------------------------------------
 db_dependency = Annotated[Session, Depends(get_db)]
+async_db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+# Read-only routes that can tolerate replica lag
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
+async_read_db_dependency = Annotated[AsyncSession, Depends(get_async_read_db)]
 admin_dependency = Annotated[dict, Depends(get_current_admin_user)]
 student_dependency = Annotated[dict, Depends(get_current_student_user)]
 general_user = Annotated[dict, Depends(get_current_user)]
+page_limit = Annotated[int, Query(ge=1, le=200)]
+if_none_match_header = Annotated[Optional[str], Header()]
+
+# Listings select just the columns their response model exposes, so rows come
+# back as plain tuples instead of tracked ORM instances
+GEOFENCE_COLUMNS = [getattr(Geofence, field) for field in GeofenceOut.model_fields]
+ATTENDANCE_COLUMNS = [
+    getattr(AttendanceRecord, field) for field in AttendanceRecordOut.model_fields
+]
+
+# Listings are per-user and change whenever a fence does: clients may keep a
+# copy but must revalidate it, which the ETag makes cheap.
+LISTING_CACHE_CONTROL = "private, no-cache"
+
+
+async def listing_not_modified(
+    db: AsyncSession, response: Response, if_none_match: Optional[str], *parts
+):
+    """Sets the listing's ETag and Cache-Control on `response` and returns a
+    bodyless 304 if the client's copy is current, at the cost of reading the
+    geofence set's version row. Call it before querying, with the session the
+    listing will use, so a change racing the query yields a fresh tag.
+    """
+    version = await geofence_version.current(db)
+    if version is None:
+        return None
+    etag = geofence_version.etag(version, *parts)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = LISTING_CACHE_CONTROL
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=304,
+            headers={"ETag": etag, "Cache-Control": LISTING_CACHE_CONTROL},
+        )
+    return None
+
+
+# ----------------------------------------Metrics--------------------------------------------
+for name, help, read, kind in [
+    ("geofence_cache_hits_total", "Active geofence cache hits.", lambda: active_geofences.hits, "counter"),
+    ("geofence_cache_misses_total", "Active geofence cache misses.", lambda: active_geofences.misses, "counter"),
+    ("token_cache_hits_total", "Verified token cache hits.", lambda: token_cache.hits, "counter"),
+    ("token_cache_misses_total", "Verified token cache misses.", lambda: token_cache.misses, "counter"),
+    ("token_revoked_rejected_total", "Requests refused for a revoked token.", lambda: token_revocations.rejected, "counter"),
+    ("password_hash_in_flight", "bcrypt calls running or waiting.", lambda: password_hasher.in_flight, "gauge"),
+    ("password_hash_rejected_total", "bcrypt calls refused with 503.", lambda: password_hasher.rejected, "counter"),
+    ("attendance_writer_pending", "Check-ins queued for write-behind.", lambda: len(attendance_writer.pending), "gauge"),
+    ("check_in_repeats_rejected_total", "Repeat check-ins rejected without a query.", lambda: check_in_registry.hits, "counter"),
+    ("attendance_writer_flushed_total", "Check-ins written by write-behind.", lambda: attendance_writer.flushed, "counter"),
+    ("attendance_writer_failed_total", "Queued check-ins dropped after retrying.", lambda: attendance_writer.failed, "counter"),
+    ("geofence_transitions_total", "Scheduled status changes applied.", lambda: geofence_scheduler.transitions, "counter"),
+    ("attendance_feed_subscribers", "Open live attendance feeds.", lambda: attendance_feed.subscriber_count, "gauge"),
+    ("attendance_feed_dropped_total", "Live feed subscribers dropped for falling behind.", lambda: attendance_feed.dropped, "counter"),
+    ("shared_fence_table_hits_total", "Check-in fence lookups answered by the shared table.", lambda: shared_fences.hits, "counter"),
+    ("shared_fence_table_misses_total", "Unknown fence codes rejected by the shared table.", lambda: shared_fences.misses, "counter"),
+    ("shared_fence_table_fallbacks_total", "Fence lookups the shared table could not answer.", lambda: shared_fences.fallbacks, "counter"),
+]:
+    metrics.register_gauge(name, help, read, kind)
+
+if settings.query_profiler:
+    query_profiler.install(engine)
+    query_profiler.install(async_engine.sync_engine)
+    for replica in replica_set.replicas:
+        query_profiler.install(replica.engine)
+        query_profiler.install(replica.async_engine.sync_engine)
+    metrics.register_collector(query_profiler.render)
+if settings.admission_control:
+    metrics.register_collector(admission_control.render)
+if replica_set.replicas:
+    metrics.register_collector(replica_set.render)
 
 
 # ----------------------------------------Routes--------------------------------------------
@@ -103,6 +269,12 @@ def index():
     return "Hello! Access our documentation by adding '/docs' to the url above"
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint for this worker."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # Webhook
 # @app.webhooks.post("New attendance")
 # def new_attendance():
@@ -111,8 +283,15 @@ def index():
 
 # ---------------------------- Endpoint to get the list of users
 @app.get("/user/")
-def get_user(user_matric: str, db: db_dependency, _: admin_dependency):
-    """Get the user and their records from the database."""
+def get_user(
+    user_matric: str, db: read_db_dependency, _: admin_dependency, compact: bool = False
+):
+    """Get the user and their records from the database.
+    With compact=true the user is sent once and the records as parallel
+    "Class name" / "Attendance timestamp" arrays, oldest first.
+    """
+    if compact:
+        return get_user_compact(user_matric, db)
     try:
         user_records = (
             db.query(
@@ -152,28 +331,65 @@ def get_user(user_matric: str, db: db_dependency, _: admin_dependency):
 
         return record
 
+    except HTTPException:
+        raise
     except Exception as e:
-        errors.logging(e)
+        logging.error(e)
         raise HTTPException(
             status_code=500,
             detail="Internal Error: Contact Administrator (This wasn't even supposed to happen lol)",
         )
 
 
+def get_user_compact(user_matric: str, db: Session):
+    """Columnar form of get_user: one user row plus two narrow columns, rather
+    than the user's fields repeated on every joined record."""
+    db_user = (
+        db.query(User.user_matric, User.username, User.role)
+        .filter(User.user_matric == user_matric)
+        .first()
+    )
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    records = (
+        db.query(AttendanceRecord.geofence_name, AttendanceRecord.timestamp)
+        .filter(
+            AttendanceRecord.user_matric == user_matric,
+            AttendanceRecord.geofence_name.is_not(None),
+            AttendanceRecord.timestamp.is_not(None),
+        )
+        .order_by(AttendanceRecord.timestamp)
+        .all()
+    )
+    return {
+        "user_matric": db_user.user_matric,
+        "username": db_user.username,
+        "role": db_user.role,
+        "Attendances": {
+            "Class name": [record.geofence_name for record in records],
+            "Attendance timestamp": [record.timestamp for record in records],
+        },
+    }
+
+
 # ---------------------------- Endpoint to list all attendance records
 @app.get("/get_attendance/")
-def get_attedance(
-    course_title: str, date: datetime, db: db_dependency, user: admin_dependency
+async def get_attedance(
+    course_title: str, date: datetime, db: async_read_db_dependency, user: admin_dependency
 ):
     """Gets the attendace record for a given course.
     User can only see the records if they created the class.
     """
-    geofence_exists = (
-        db.query(Geofence)
+    day_start, day_end = day_range(date)
+    geofence_exists = await db.scalar(
+        select(Geofence)
         .filter(
-            Geofence.name == course_title, func.date(Geofence.start_time) == date.date()
+            Geofence.name == course_title,
+            Geofence.start_time >= day_start,
+            Geofence.start_time < day_end,
         )
-        .first()
+        .limit(1)
     )
 
     if not geofence_exists:
@@ -189,68 +405,396 @@ def get_attedance(
         )
 
     attendances = (
-        db.query(
-            User.username, AttendanceRecord.user_matric, AttendanceRecord.timestamp
+        await db.execute(
+            select(
+                User.username, AttendanceRecord.user_matric, AttendanceRecord.timestamp
+            )
+            .join(User, AttendanceRecord.user_matric == User.user_matric)
+            .filter(
+                AttendanceRecord.geofence_name == course_title,
+                AttendanceRecord.timestamp >= day_start,
+                AttendanceRecord.timestamp < day_end,
+            )
+        )
+    ).all()
+
+    if not attendances:
+        raise HTTPException(status_code=404, detail="No attendance records yet")
+
+    return {
+        f"{course_title} attendance records": [row._asdict() for row in attendances]
+    }
+
+
+# ---------------------------- Endpoint to export attendance records as a stream
+EXPORT_COLUMNS = ["username", "user_matric", "geofence_name", "timestamp"]
+EXPORT_BATCH_SIZE = 1000
+
+
+async def stream_attendance_export(statement, file_format: str, session_factory):
+    """Yields the export chunk by chunk from a server-side cursor.
+    Opens its own session since the request's one is closed before the body is sent.
+    """
+    if file_format == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\r\n"
+
+    async with session_factory() as db:
+        result = await db.stream(
+            statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            buffer = io.StringIO()
+            if file_format == "csv":
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow(
+                        [row.username, row.user_matric, row.geofence_name, row.timestamp]
+                    )
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(row._asdict(), default=str) + "\n")
+            yield buffer.getvalue()
+
+
+@app.get("/export_attendance/")
+async def export_attendance(
+    course_title: str,
+    start_date: date_type,
+    db: async_read_db_dependency,
+    user: admin_dependency,
+    end_date: Optional[date_type] = None,
+    file_format: Literal["csv", "ndjson"] = "csv",
+):
+    """Streams the attendance records of a course as CSV or NDJSON.
+    Covers start_date through end_date (inclusive, defaults to start_date).
+    User can only export the records if they created every class in the range.
+    """
+    end_date = end_date or start_date
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    range_start, _ = day_range(start_date)
+    _, range_end = day_range(end_date)
+
+    creators = (
+        await db.scalars(
+            select(Geofence.creator_matric)
+            .filter(
+                Geofence.name == course_title,
+                Geofence.start_time >= range_start,
+                Geofence.start_time < range_end,
+            )
+            .distinct()
+        )
+    ).all()
+
+    if not creators:
+        raise HTTPException(
+            status_code=404,
+            detail="Geofence doesn't exist for specified course and dates. No records",
+        )
+
+    if any(creator != user["user_matric"] for creator in creators):
+        raise HTTPException(
+            status_code=401,
+            detail="No permission to export this class attendances, as you're not the creator of the geofence",
+        )
+
+    statement = (
+        select(
+            User.username,
+            AttendanceRecord.user_matric,
+            AttendanceRecord.geofence_name,
+            AttendanceRecord.timestamp,
         )
         .join(User, AttendanceRecord.user_matric == User.user_matric)
         .filter(
             AttendanceRecord.geofence_name == course_title,
-            func.date(AttendanceRecord.timestamp) == date,
+            AttendanceRecord.timestamp >= range_start,
+            AttendanceRecord.timestamp < range_end,
         )
-        .all()
+        .order_by(AttendanceRecord.timestamp, AttendanceRecord.id)
     )
 
-    if not attendances:
-        raise HTTPException(status_code=404, detail="No attendance records yet")
+    media_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+    filename = f"{course_title}_{start_date}_{end_date}.{file_format}"
+    return StreamingResponse(
+        stream_attendance_export(
+            statement, file_format, async_read_sessionmaker(user["user_matric"])
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": attachment(filename)},
+    )
 
-    return {f"{course_title} attendance records": attendances}
+
+# ---------------------------- Endpoint for course attendance analytics
+@app.get("/attendance_analytics/")
+async def attendance_analytics(
+    course_title: str, db: async_read_db_dependency, user: admin_dependency
+):
+    """Attendance rates for a course, per session day and per student.
+    Served from the aggregate tables only, never by scanning AttendanceRecords.
+    User can only see the analytics of a course they created classes for.
+    """
+    is_creator = await db.scalar(
+        select(Geofence.id)
+        .filter(
+            Geofence.creator_matric == user["user_matric"],
+            Geofence.name == course_title,
+        )
+        .limit(1)
+    )
+    if not is_creator:
+        raise HTTPException(
+            status_code=401,
+            detail="No permission to view this course's analytics, as you're not the creator of its geofences",
+        )
+
+    sessions = (
+        await db.execute(
+            select(
+                CourseSessionAttendance.session_date,
+                CourseSessionAttendance.check_ins,
+            )
+            .filter(CourseSessionAttendance.geofence_name == course_title)
+            .order_by(CourseSessionAttendance.session_date)
+        )
+    ).all()
+    students = (
+        await db.execute(
+            select(
+                CourseStudentAttendance.user_matric,
+                CourseStudentAttendance.check_ins,
+                CourseStudentAttendance.last_check_in,
+            )
+            .filter(CourseStudentAttendance.geofence_name == course_title)
+            .order_by(
+                CourseStudentAttendance.check_ins.desc(),
+                CourseStudentAttendance.user_matric,
+            )
+        )
+    ).all()
+
+    # Students are those who checked in at least once; sessions are course-days
+    session_count, student_count = len(sessions), len(students)
+    total_check_ins = sum(session.check_ins for session in sessions)
+    return {
+        "course": course_title,
+        "session_count": session_count,
+        "student_count": student_count,
+        "average_attendance_rate": (
+            total_check_ins / (session_count * student_count) if student_count else 0.0
+        ),
+        "sessions": [
+            {
+                "date": session.session_date,
+                "check_ins": session.check_ins,
+                "attendance_rate": session.check_ins / student_count,
+            }
+            for session in sessions
+        ],
+        "students": [
+            {
+                "user_matric": student.user_matric,
+                "check_ins": student.check_ins,
+                "attendance_rate": student.check_ins / session_count,
+                "last_check_in": student.last_check_in,
+            }
+            for student in students
+        ],
+    }
+
+
+# ---------------------------- Endpoints streaming a fence's check-ins live to its creator
+FEED_KEEPALIVE = 15
+
+
+def feed_check_in(user_matric: str, username: str, timestamp: datetime):
+    return {
+        "type": "check_in",
+        "user_matric": user_matric,
+        "username": username,
+        "timestamp": timestamp.isoformat(),
+    }
+
+
+async def open_attendance_feed(db: AsyncSession, fence_code: str, user: dict):
+    """Checks the user created the fence, subscribes, then takes the snapshot.
+    Subscribing first means nothing recorded in between is missed.
+    """
+    geofence = await db.scalar(
+        select(Geofence).filter(Geofence.fence_code == fence_code).limit(1)
+    )
+    if not geofence:
+        raise HTTPException(
+            status_code=404, detail=f"Geofence code: {fence_code} not found"
+        )
+    if geofence.creator_matric != user["user_matric"]:
+        raise HTTPException(
+            status_code=401,
+            detail="No permission to view this class attendances, as you're not the creator of the geofence",
+        )
+
+    try:
+        subscription = attendance_feed.subscribe(fence_code)
+    except FeedFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many live feeds open. Please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+    try:
+        rows = (
+            await db.execute(
+                select(User.username, AttendanceRecord.user_matric, AttendanceRecord.timestamp)
+                .join(User, AttendanceRecord.user_matric == User.user_matric)
+                .filter(AttendanceRecord.fence_code == fence_code)
+                .order_by(AttendanceRecord.timestamp, AttendanceRecord.id)
+            )
+        ).all()
+    except BaseException:
+        attendance_feed.unsubscribe(subscription)
+        raise
+
+    snapshot = {
+        "type": "snapshot",
+        "fence_code": fence_code,
+        "status": geofence.status,
+        "check_ins": [
+            feed_check_in(row.user_matric, row.username, row.timestamp) for row in rows
+        ],
+    }
+    return subscription, snapshot
+
+
+async def attendance_feed_events(subscription, snapshot: dict):
+    """Yields the snapshot, then check-ins not already in it, until the fence is
+    deactivated or the subscriber is dropped. Yields None when idle for
+    FEED_KEEPALIVE seconds so the transport can send a keep-alive.
+    """
+    seen = {check_in["user_matric"] for check_in in snapshot["check_ins"]}
+    try:
+        yield snapshot
+        if snapshot["status"] == "inactive":
+            return
+        while True:
+            event = await subscription.get(FEED_KEEPALIVE)
+            if event is not None and event["type"] == "check_in":
+                if event["user_matric"] in seen:
+                    continue
+                seen.add(event["user_matric"])
+            yield event
+            if event is not None and event["type"] in ("closed", "dropped"):
+                return
+    finally:
+        attendance_feed.unsubscribe(subscription)
+
+
+async def server_sent_events(events):
+    async for event in events:
+        if event is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+@app.get("/attendance_feed/")
+async def attendance_feed_sse(
+    fence_code: str, db: async_db_dependency, user: admin_dependency
+):
+    """Server-Sent Events stream of a fence's check-ins, for its creator only.
+    Sends a `snapshot` event with everyone checked in so far, then one
+    `check_in` event per new check-in, and `closed` when the fence ends.
+    """
+    subscription, snapshot = await open_attendance_feed(db, fence_code, user)
+    return StreamingResponse(
+        server_sent_events(attendance_feed_events(subscription, snapshot)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/ws/attendance_feed/")
+async def attendance_feed_websocket(websocket: WebSocket, fence_code: str, token: str):
+    """The same feed as /attendance_feed/ over a WebSocket, one JSON message per event.
+    Browsers can't set headers on the handshake, so the bearer token is passed
+    as the `token` query parameter.
+    """
+    try:
+        user = decode_token(token)
+        if user["role"] != "admin":
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+        # Own session, so no pooled connection is held for the life of the socket
+        async with AsyncSessionLocal() as db:
+            subscription, snapshot = await open_attendance_feed(db, fence_code, user)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    events = attendance_feed_events(subscription, snapshot)
+    try:
+        async for event in events:
+            await websocket.send_json(event or {"type": "keep-alive"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await events.aclose()
+
+
+@app.get("/attendance_feed_stats/")
+def attendance_feed_stats(_: admin_dependency):
+    """Subscribers and dropped slow consumers of this worker's live feeds."""
+    return attendance_feed.stats()
 
 
 # ---------------------------- Endpoint to list user attendance records
-@app.get("/user_get_attendance/")
-def user_get_attendance(
-    db: db_dependency,
+@app.get("/user_get_attendance/", response_model=list[AttendanceRecordOut])
+async def user_get_attendance(
+    db: async_read_db_dependency,
     user: student_dependency,
+    response: Response,
     course_title: Optional[str] = None,
+    limit: page_limit = 50,
+    after: Optional[str] = None,
 ):
-    """Gets the attendance records of a student, for the student.
+    """Gets the attendance records of a student, for the student, newest first.
     If no class is specified, returns all records of the student.
     if specified, returns all records of the student for the particular class.
+    Results are paged: pass the X-Next-Cursor response header back as `after`.
     """
     # when a user provides a geofence/course name
     if course_title is not None:
-        course_exist = db.query(Geofence).filter(Geofence.name == course_title).all()
+        course_exist = await db.scalar(
+            select(Geofence.id).filter(Geofence.name == course_title).limit(1)
+        )
 
         if not course_exist:
             raise HTTPException(status_code=404, detail="Geofence Not found")
 
-        user_attendances = (
-            db.query(AttendanceRecord)
-            .filter(
-                AttendanceRecord.user_matric == user["user_matric"],
-                AttendanceRecord.geofence_name == course_title,
-            )
-            .all()
+        statement = select(*ATTENDANCE_COLUMNS).filter(
+            AttendanceRecord.user_matric == user["user_matric"],
+            AttendanceRecord.geofence_name == course_title,
         )
-        if not user_attendances:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No attendance records for {course_title} yet",
-            )
-
-        return user_attendances
-
+        not_found = f"No attendance records for {course_title} yet"
     else:
         # when the user doesn't specify a course_title
-        user_attendances = (
-            db.query(AttendanceRecord)
-            .filter(AttendanceRecord.user_matric == user["user_matric"])
-            .all()
+        statement = select(*ATTENDANCE_COLUMNS).filter(
+            AttendanceRecord.user_matric == user["user_matric"]
         )
-        if not user_attendances:
-            raise HTTPException(status_code=404, detail="No Attendance records yet")
+        not_found = "No Attendance records yet"
 
-        return user_attendances
+    user_attendances = (
+        await db.execute(
+            keyset_page(
+                statement, AttendanceRecord.timestamp, AttendanceRecord.id, limit, after
+            )
+        )
+    ).all()
+    if not user_attendances and after is None:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    return finish_page(user_attendances, limit, response, "timestamp")
 
     # except Exception as e:
     #     # logging.error(e)
@@ -258,58 +802,205 @@ def user_get_attendance(
     #     raise HTTPException(status_code=500, detail=f"Internal error, please try again")
 
 
+# ---------------------------- Endpoint to summarise a student's attendance per course
+@app.get("/attendance_summary/", response_model=AttendanceSummary)
+async def attendance_summary(
+    db: async_read_db_dependency,
+    user: general_user,
+    user_matric: Optional[str] = None,
+    course_title: Optional[str] = None,
+    start_date: Optional[date_type] = None,
+    end_date: Optional[date_type] = None,
+):
+    """Check-in count and first/last attendance per course, grouped in SQL.
+    Students get their own summary; admins pass the student's user_matric.
+    start_date/end_date (inclusive) optionally bound the records counted.
+    """
+    if user["role"] == "admin":
+        if user_matric is None:
+            raise HTTPException(
+                status_code=400, detail="user_matric is required for admins"
+            )
+    elif user_matric not in (None, user["user_matric"]):
+        raise HTTPException(
+            status_code=403, detail="Not enough permissions"
+        )
+    else:
+        user_matric = user["user_matric"]
+
+    statement = (
+        select(
+            AttendanceRecord.geofence_name,
+            func.count().label("check_ins"),
+            func.min(AttendanceRecord.timestamp).label("first_attendance"),
+            func.max(AttendanceRecord.timestamp).label("last_attendance"),
+        )
+        .filter(
+            AttendanceRecord.user_matric == user_matric,
+            AttendanceRecord.geofence_name.is_not(None),
+        )
+        .group_by(AttendanceRecord.geofence_name)
+        .order_by(AttendanceRecord.geofence_name)
+    )
+    if course_title is not None:
+        statement = statement.filter(AttendanceRecord.geofence_name == course_title)
+    if start_date is not None:
+        statement = statement.filter(AttendanceRecord.timestamp >= day_range(start_date)[0])
+    if end_date is not None:
+        statement = statement.filter(AttendanceRecord.timestamp < day_range(end_date)[1])
+
+    courses = [
+        {
+            "course": row.geofence_name,
+            "check_ins": row.check_ins,
+            "first_attendance": row.first_attendance,
+            "last_attendance": row.last_attendance,
+        }
+        for row in await db.execute(statement)
+    ]
+    return {
+        "user_matric": user_matric,
+        "total_check_ins": sum(course["check_ins"] for course in courses),
+        "courses": courses,
+    }
+
+
 # ---------------------------- Endpoint to get a list of Geofences
-@app.get("/get_geofences/")
-def get_geofences(
-    db: db_dependency,
+@app.get("/get_geofences/", response_model=GeofenceList)
+async def get_geofences(
+    db: async_read_db_dependency,
     _: general_user,
+    response: Response,
     course_title: Optional[str] = None,
+    limit: page_limit = 50,
+    after: Optional[str] = None,
+    if_none_match: if_none_match_header = None,
 ):
-    """Gets all the active geofences.
+    """Gets all the active geofences, newest first.
+    Results are paged: pass the X-Next-Cursor response header back as `after`.
+    Send the ETag back as If-None-Match to get a 304 when nothing changed.
     (Will later be implemented as a websocket to update list in real-time)
     """
+    not_modified = await listing_not_modified(
+        db, response, if_none_match, "get_geofences", course_title, limit, after
+    )
+    if not_modified:
+        return not_modified
 
-    if course_title is None:
-        geofences = db.query(Geofence).all()
-    else:
-        geofences = db.query(Geofence).filter(Geofence.name == course_title).all()
+    statement = select(*GEOFENCE_COLUMNS)
+    if course_title is not None:
+        statement = statement.filter(Geofence.name == course_title)
+
+    geofences = (
+        await db.execute(
+            keyset_page(statement, Geofence.time_created, Geofence.id, limit, after)
+        )
+    ).all()
 
-    if not geofences:
+    if not geofences and after is None:
         raise HTTPException(status_code=404, detail="No geofences found")
 
-    geofences_ordered = geofences[::-1]
-    return {"geofences": geofences_ordered}
+    return {"geofences": finish_page(geofences, limit, response, "time_created")}
 
 
-@app.get("/get_my_geofences_created")
-def get_my_geofences_created(
-    user: admin_dependency, db: db_dependency, course_title: Optional[str] = None
+@app.get("/get_my_geofences_created", response_model=list[GeofenceOut])
+async def get_my_geofences_created(
+    user: admin_dependency,
+    db: async_read_db_dependency,
+    response: Response,
+    course_title: Optional[str] = None,
+    limit: page_limit = 50,
+    after: Optional[str] = None,
+    if_none_match: if_none_match_header = None,
 ):
-    """Gets the geofences created by user requesting from this endpoint."""
+    """Gets the geofences created by user requesting from this endpoint, newest first.
+    Results are paged: pass the X-Next-Cursor response header back as `after`.
+    Send the ETag back as If-None-Match to get a 304 when nothing changed.
+    """
+    not_modified = await listing_not_modified(
+        db,
+        response,
+        if_none_match,
+        "get_my_geofences_created",
+        user["user_matric"],
+        course_title,
+        limit,
+        after,
+    )
+    if not_modified:
+        return not_modified
+    statement = select(*GEOFENCE_COLUMNS).filter(
+        Geofence.creator_matric == user["user_matric"]
+    )
     if course_title is not None:
-        geofences = (
-            db.query(Geofence)
-            .filter(
-                Geofence.name == course_title,
-                Geofence.creator_matric == user["user_matric"],
-            )
-            .all()
-        )
-    else:
-        geofences = (
-            db.query(Geofence)
-            .filter(Geofence.creator_matric == user["user_matric"])
-            .all()
+        statement = statement.filter(Geofence.name == course_title)
+
+    geofences = (
+        await db.execute(
+            keyset_page(statement, Geofence.time_created, Geofence.id, limit, after)
         )
+    ).all()
 
-    if not geofences:
+    if not geofences and after is None:
         raise HTTPException(
             status_code=404, detail="No geofences has been created by you yet"
         )
 
+    return finish_page(geofences, limit, response, "time_created")
+
 
-    geofences_ordered = geofences[::-1]
-    return geofences_ordered
+# ---------------------------- Endpoint to find the active geofences around the user
+@app.get("/geofences_at_location/")
+async def geofences_at_location(
+    lat: Annotated[float, Query(ge=-90, le=90)],
+    long: Annotated[float, Query(ge=-180, le=180)],
+    db: async_db_dependency,
+    _: student_dependency,
+):
+    """Gets the active geofences that contain the user's location,
+    so the app can offer check-in without the student typing a code.
+    """
+    fence_set = (await active_fences.get(db)).fence_set
+    return {
+        "geofences": [
+            {
+                "fence_code": fence.fence_code,
+                "name": fence.name,
+                "end_time": fence.end_time,
+            }
+            for fence in fence_set.containing(lat, long)
+        ]
+    }
+
+
+# ---------------------------- Endpoint to find active geofences near the user
+@app.get("/geofences_near_me/")
+async def geofences_near_me(
+    lat: Annotated[float, Query(ge=-90, le=90)],
+    long: Annotated[float, Query(ge=-180, le=180)],
+    db: async_db_dependency,
+    _: general_user,
+    distance: Annotated[float, Query(ge=0, le=5000)] = 200,
+):
+    """Gets the active geofences whose boundary is within `distance` metres of the user."""
+    fence_grid = (await active_fences.get(db)).grid
+    nearby = [
+        (haversine(lat, long, fence.latitude, fence.longitude), fence)
+        for fence in fence_grid.near(lat, long, distance)
+    ]
+    nearby.sort(key=lambda item: item[0])
+    return {
+        "geofences": [
+            {
+                "fence_code": fence.fence_code,
+                "name": fence.name,
+                "distance_to_centre": round(centre_distance, 1),
+                "radius": fence.radius,
+                "end_time": fence.end_time,
+            }
+            for centre_distance, fence in nearby
+        ]
+    }
 
 
 # ---------------------------- Endpoint to create Geofence
@@ -325,11 +1016,13 @@ def create_geofence(
     start_time_utc = start_time.astimezone(ZoneInfo("UTC"))
     end_time_utc = end_time.astimezone(ZoneInfo("UTC"))
     # Check if a geofence with the same name and date exists
+    day_start, day_end = day_range(start_time_utc)
     db_geofence = (
         db.query(Geofence)
         .filter(
             Geofence.name == geofence.name,
-            func.date(Geofence.start_time) == start_time_utc.date(),
+            Geofence.start_time >= day_start,
+            Geofence.start_time < day_end,
         )
         .first()
     )
@@ -375,17 +1068,26 @@ def create_geofence(
             ),
             time_created=datetime.now(ZoneInfo("UTC")),
         )
-        print(start_time, end_time)
-        print(start_time_utc, end_time_utc)
+        logging.debug(f"Geofence {code} runs {start_time_utc} to {end_time_utc} UTC")
         db.add(new_geofence)
+        geofence_version.bump(db)
         db.commit()
         db.refresh(new_geofence)
+        on_geofence_change(code, new_geofence.status)
+        geofence_scheduler.schedule(
+            new_geofence.id,
+            code,
+            start_time_utc,
+            end_time_utc,
+            new_geofence.status,
+        )
 
         return {"Code": code, "name": geofence.name}
 
-    except errors.IntegrityError as e:
-        errors.logging(e)
-        if e.errno == 1062:  # Duplicate entry error code
+    except IntegrityError as e:
+        db.rollback()
+        logging.error(e)
+        if is_duplicate_entry(e):
             raise HTTPException(
                 status_code=400, detail="Geofence with this code already exists"
             )
@@ -403,9 +1105,14 @@ def manual_deactivate_geofence(
     """Manually deactivates the Geofence for the admin."""
 
     # Check if geofence exists
+    day_start, day_end = day_range(date)
     geofence = (
         db.query(Geofence)
-        .filter(Geofence.name == geofence_name, func.date(Geofence.start_time) == date)
+        .filter(
+            Geofence.name == geofence_name,
+            Geofence.start_time >= day_start,
+            Geofence.start_time < day_end,
+        )
         .first()
     )
 
@@ -421,9 +1128,11 @@ def manual_deactivate_geofence(
 
         # Update if all checks passed
         geofence.status = "inactive"
+        geofence_version.bump(db)
 
         db.commit()
         db.refresh(geofence)
+        on_geofence_change(geofence.fence_code, geofence.status)
 
         return f"Successfully deactivated geofence {geofence_name} for {date} "
 
@@ -442,52 +1151,138 @@ def manual_deactivate_geofence(
     #     )
 
 
+async def queue_attendance(db: AsyncSession, new_attendance: dict, on_commit=None):
+    """Hands a validated check-in to the write-behind queue; `on_commit` runs
+    once it is stored. The key is reserved before the DB check so concurrent
+    retries can't both pass.
+    """
+    matric_fence_code = new_attendance["matric_fence_code"]
+    if not attendance_writer.reserve(matric_fence_code):
+        raise HTTPException(
+            status_code=400,
+            detail="User has already signed attendance for this class",
+        )
+    try:
+        already_recorded = await db.scalar(
+            select(AttendanceRecord.id)
+            .filter(
+                AttendanceRecord.user_matric == new_attendance["user_matric"],
+                AttendanceRecord.fence_code == new_attendance["fence_code"],
+            )
+            .limit(1)
+        )
+        if already_recorded:
+            raise HTTPException(
+                status_code=400,
+                detail="User has already signed attendance for this class",
+            )
+        await attendance_writer.submit(new_attendance, on_commit)
+    except WriteBehindFull:
+        attendance_writer.release(matric_fence_code)
+        raise HTTPException(
+            status_code=503,
+            detail="Too many check-ins right now. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+    except BaseException:
+        attendance_writer.release(matric_fence_code)
+        raise
+
+
 # ---------------------------- Endpoint to validate user attendance and store in database
 @app.post("/record_attendance/")
-def validate_attendance(
+async def validate_attendance(
     fence_code: str,
     lat: float,
     long: float,
-    db: db_dependency,
+    db: async_db_dependency,
     user: student_dependency,
 ):
     """Student Endpoint for validating attendance"""
 
+    # Repeat submissions are answered from memory, before any DB work
+    if check_in_registry.contains(fence_code, user["user_matric"]):
+        raise HTTPException(
+            status_code=400,
+            detail="User has already signed attendance for this class",
+        )
+
+    # Cached radius check: reject out-of-range submissions before any DB work
+    # when the fence is in this worker's fresh active-fence snapshot
+    snapshot = active_fences.peek()
+    if snapshot is not None and snapshot.radius_check(fence_code, lat, long) is False:
+        raise HTTPException(
+            status_code=400,
+            detail="User is not within geofence, attendance not recorded",
+        )
+
     # Check if user exists
-    db_user = db.query(User).filter(User.user_matric == user["user_matric"]).first()
-    if db_user is None:
+    db_user_matric = await db.scalar(
+        select(User.user_matric).filter(User.user_matric == user["user_matric"])
+    )
+    if db_user_matric is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Check if geofence exists
-    geofence = (
-        db.query(Geofence)
-        .filter(Geofence.fence_code == fence_code, Geofence.status == "active")
-        .first()
-    )
-    if not geofence:
+    # Check if geofence exists: the node's shared table answers without the DB
+    # while it is up to date, then this worker's cache, then the DB
+    authoritative, geofence = shared_fences.lookup(fence_code)
+    if authoritative and geofence is None:
         raise HTTPException(
             status_code=404,
             detail=f"Geofence code: {fence_code} not found or is not active",
         )
+    if geofence is None:
+        geofence = active_geofences.get(fence_code)
+    if geofence is None:
+        db_geofence = await db.scalar(
+            select(Geofence)
+            .filter(Geofence.fence_code == fence_code, Geofence.status == "active")
+            .limit(1)
+        )
+        if not db_geofence:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Geofence code: {fence_code} not found or is not active",
+            )
+        geofence = active_geofences.put(db_geofence)
+
+    await check_in_registry.warm(db, geofence.fence_code)
+    if check_in_registry.contains(geofence.fence_code, db_user_matric):
+        raise HTTPException(
+            status_code=400,
+            detail="User has already signed attendance for this class",
+        )
 
     try:
         if (
             geofence.status.lower() == "active"
         ):  # Proceed to check if user is in geofence and record attendance
             if check_user_in_circular_geofence(lat, long, geofence):
-                matric_fence_code = db_user.user_matric + geofence.fence_code
+                matric_fence_code = db_user_matric + geofence.fence_code
 
-                new_attendance = AttendanceRecord(
-                    user_matric=db_user.user_matric,
-                    fence_code=fence_code,
+                new_attendance = dict(
+                    user_matric=db_user_matric,
+                    fence_code=geofence.fence_code,
                     geofence_name=geofence.name,
-                    timestamp=datetime.now(),
+                    # Naive UTC, like the batch route and the fences' own times
+                    timestamp=utc_now(),
                     matric_fence_code=matric_fence_code,
                 )
 
-                db.add(new_attendance)
-                db.commit()
-                db.refresh(new_attendance)
+                event = feed_check_in(db_user_matric, user["username"], new_attendance["timestamp"])
+                if attendance_writer.running:
+                    # Lecturers only see the check-in once its batch commits
+                    await queue_attendance(
+                        db,
+                        new_attendance,
+                        on_commit=lambda: attendance_feed.publish(geofence.fence_code, event),
+                    )
+                else:
+                    await db.execute(insert(AttendanceRecord).values(new_attendance))
+                    await record_check_ins(db, [new_attendance])
+                    await db.commit()
+                    attendance_feed.publish(geofence.fence_code, event)
+                check_in_registry.add(geofence.fence_code, db_user_matric)
 
                 # THE ONLY SUCCESS
                 return {"message": "Attendance recorded successfully"}
@@ -502,20 +1297,202 @@ def validate_attendance(
             status_code=404, detail="Geofence is not open for attendance"
         )
 
-    except errors.IntegrityError as e:
-        if e.errno == 1062:
-            errors.logging(e)
+    except IntegrityError as e:
+        await db.rollback()
+        logging.error(e)
+        if is_duplicate_entry(e):
+            check_in_registry.add(geofence.fence_code, db_user_matric)
             raise HTTPException(
                 status_code=400,
                 detail="User has already signed attendance for this class",
             )
         else:
-            errors.logging(e)
             raise HTTPException(
                 status_code=500, detail=f"An error occured. Please retry"
             )
 
 
+# ---------------------------- Endpoint to inspect the active geofence cache
+@app.get("/geofence_cache_stats/")
+def geofence_cache_stats(_: admin_dependency):
+    """Hit/miss counters of this worker's active geofence cache."""
+    return active_geofences.stats()
+
+
+@app.get("/shared_fence_table_stats/")
+def shared_fence_table_stats(_: admin_dependency):
+    """Owner, contents and lookup counters of the node's shared active-fence table."""
+    return shared_fences.stats()
+
+
+@app.get("/attendance_writer_stats/")
+def attendance_writer_stats(_: admin_dependency):
+    """Queue depth and flush counters of this worker's write-behind queue."""
+    return attendance_writer.stats()
+
+
+@app.get("/check_in_registry_stats/")
+def check_in_registry_stats(_: admin_dependency):
+    """Fences tracked and repeat check-ins rejected from memory on this worker."""
+    return check_in_registry.stats()
+
+
+@app.get("/admission_stats/")
+def admission_stats(_: admin_dependency):
+    """Slots in use, queued requests and shed counts of this worker's admission limiters."""
+    return admission_control.stats()
+
+
+@app.get("/replica_stats/")
+def replica_stats(_: admin_dependency):
+    """Health and read counts of the read replicas, and reads kept on the primary."""
+    return replica_set.stats()
+
+
+@app.get("/query_profiler_stats/")
+def query_profiler_stats(_: admin_dependency):
+    """Queries per request, DB time and repeated statements per route on this worker."""
+    return query_profiler.route_stats()
+
+
+# ---------------------------- Endpoint to upload check-ins queued offline on the device
+OFFLINE_CLOCK_SKEW = timedelta(minutes=2)
+
+
+@app.post("/record_attendance/batch/")
+async def validate_attendance_batch(
+    batch: BatchCheckInRequest,
+    db: async_db_dependency,
+    user: student_dependency,
+):
+    """Student Endpoint for uploading many check-ins at once (e.g. queued offline).
+    Each entry gets the same checks as /record_attendance/, with the fence's
+    start/end window checked against client_timestamp. All valid entries are
+    recorded in one transaction and a result is returned per entry.
+    """
+    db_user_matric = await db.scalar(
+        select(User.user_matric).filter(User.user_matric == user["user_matric"])
+    )
+    if db_user_matric is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    check_ins = batch.check_ins
+    fence_codes = {check_in.fence_code for check_in in check_ins}
+
+    # One query for every referenced fence, one for existing records
+    fences = {
+        fence.fence_code: fence
+        for fence in await db.scalars(
+            select(Geofence).filter(
+                Geofence.fence_code.in_(fence_codes), Geofence.status == "active"
+            )
+        )
+    }
+    already_recorded = set(
+        await db.scalars(
+            select(AttendanceRecord.fence_code).filter(
+                AttendanceRecord.user_matric == db_user_matric,
+                AttendanceRecord.fence_code.in_(fence_codes),
+            )
+        )
+    )
+
+    # Radius check of every entry against its own fence in one vectorised pass
+    known = [i for i, check_in in enumerate(check_ins) if check_in.fence_code in fences]
+    inside = dict(
+        zip(
+            known,
+            within_radius(
+                [check_ins[i].lat for i in known],
+                [check_ins[i].long for i in known],
+                [fences[check_ins[i].fence_code].latitude for i in known],
+                [fences[check_ins[i].fence_code].longitude for i in known],
+                [fences[check_ins[i].fence_code].radius for i in known],
+            ),
+        )
+    )
+
+    now = utc_now()
+    results, new_attendances = [], []
+    for i, check_in in enumerate(check_ins):
+        fence = fences.get(check_in.fence_code)
+        timestamp = check_in.client_timestamp
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=ZoneInfo("Africa/Lagos"))
+        timestamp = utc_naive(timestamp)
+        matric_fence_code = db_user_matric + check_in.fence_code
+
+        if fence is None:
+            detail = f"Geofence code: {check_in.fence_code} not found or is not active"
+        elif timestamp > now + OFFLINE_CLOCK_SKEW or not (
+            utc_naive(fence.start_time) <= timestamp <= utc_naive(fence.end_time)
+        ):
+            detail = "Check-in time is outside the geofence's open window"
+        elif not inside[i]:
+            detail = "User is not within geofence, attendance not recorded"
+        elif (
+            check_in.fence_code in already_recorded
+            or matric_fence_code in attendance_writer.pending
+        ):
+            detail = "User has already signed attendance for this class"
+        else:
+            detail = None
+            already_recorded.add(check_in.fence_code)
+            new_attendances.append(
+                dict(
+                    user_matric=db_user_matric,
+                    fence_code=check_in.fence_code,
+                    geofence_name=fence.name,
+                    timestamp=timestamp,
+                    matric_fence_code=matric_fence_code,
+                )
+            )
+        results.append(
+            {
+                "fence_code": check_in.fence_code,
+                "recorded": detail is None,
+                "detail": detail or "Attendance recorded successfully",
+            }
+        )
+
+    if new_attendances:
+        try:
+            await db.execute(insert(AttendanceRecord), new_attendances)
+            await record_check_ins(db, new_attendances)
+            await db.commit()
+        except IntegrityError as e:
+            # Lost a race with a live check-in; record the rest one by one
+            await db.rollback()
+            logging.error(e)
+            failed = set()
+            for new_attendance in new_attendances:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(insert(AttendanceRecord).values(new_attendance))
+                        await record_check_ins(db, [new_attendance])
+                except IntegrityError:
+                    failed.add(new_attendance["fence_code"])
+            await db.commit()
+            for result in results:
+                if result["recorded"] and result["fence_code"] in failed:
+                    result["recorded"] = False
+                    result["detail"] = "User has already signed attendance for this class"
+
+    recorded = {result["fence_code"] for result in results if result["recorded"]}
+    for new_attendance in new_attendances:
+        if new_attendance["fence_code"] in recorded:
+            check_in_registry.add(new_attendance["fence_code"], db_user_matric)
+            attendance_feed.publish(
+                new_attendance["fence_code"],
+                feed_check_in(db_user_matric, user["username"], new_attendance["timestamp"]),
+            )
+
+    return {
+        "recorded": sum(result["recorded"] for result in results),
+        "results": results,
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
 
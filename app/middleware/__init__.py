@@ -0,0 +1,4 @@
+from .requestMetrics import RequestMetricsMiddleware, metrics
+from .queryProfiler import QueryProfilerMiddleware, query_profiler
+from .admissionControl import AdmissionControlMiddleware, admission_control
+from .readYourWrites import ReadYourWritesMiddleware
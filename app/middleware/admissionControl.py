@@ -0,0 +1,350 @@
+import asyncio
+import math
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException
+
+from app.settings import settings
+from app.utils.decodeAccessToken import decode_token
+
+
+class ConcurrencyLimiter:
+    """At most `max_concurrent` requests run at once; up to `max_queue` more
+    wait (FIFO) for at most `queue_timeout` seconds. Anything else is shed.
+
+    Bounding both the work in flight and the time spent queueing keeps the
+    latency of admitted requests flat under overload: excess load is turned
+    away at the door instead of piling up behind the DB pool.
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Client went away; hand back a slot that was granted in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        if waiter.done() and not waiter.cancelled():
+            self.admitted += 1
+            return True
+        self._discard(waiter)
+        self.shed_timeout += 1
+        return False
+
+    def release(self):
+        # The slot passes straight to the oldest waiter, so `active` is unchanged
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def stats(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+        }
+
+
+class UserRateLimiter:
+    """Token bucket per user_matric: `burst` requests at once, refilled at
+    `rate` per second. Idle buckets are evicted LRU beyond `max_users`."""
+
+    def __init__(self, rate: float, burst: int, max_users: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self.limited = 0
+
+    def take(self, user_matric: str) -> float:
+        """Spends a token. Returns 0 if one was available, otherwise the
+        seconds until the next one is."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(user_matric, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+            self.limited += 1
+        self._buckets[user_matric] = (tokens, now)
+        while len(self._buckets) > self.max_users:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "users": len(self._buckets),
+            "limited": self.limited,
+        }
+
+
+class RouteGroup:
+    """An expensive set of paths sharing one concurrency limit and, if
+    `per_user` is set, the per-user token buckets.
+
+    `streaming` routes keep their response open for minutes (live feeds,
+    exports), so they bypass the global limiter, which would otherwise lose
+    a slot to each of them for its whole life; only their own limit applies.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        paths: tuple[str, ...],
+        limiter: Optional[ConcurrencyLimiter],
+        per_user=True,
+        streaming=False,
+    ):
+        self.name = name
+        self.paths = paths
+        self.limiter = limiter
+        self.per_user = per_user
+        self.streaming = streaming
+
+    def matches(self, path: str):
+        return path in self.paths
+
+
+def bearer_user_matric(scope) -> Optional[str]:
+    """user_matric of the request's bearer token, or None if there is no valid
+    one (the route's own dependency will then answer with a 401)."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                return decode_token(token)["user_matric"]
+            except HTTPException:
+                return None
+    return None
+
+
+class AdmissionControl:
+    def __init__(
+        self,
+        global_limiter: Optional[ConcurrencyLimiter],
+        groups: list[RouteGroup],
+        user_limiter: Optional[UserRateLimiter],
+        exempt_paths: tuple[str, ...] = (),
+    ):
+        self.global_limiter = global_limiter
+        self.groups = groups
+        self.user_limiter = user_limiter
+        self.exempt_paths = exempt_paths
+
+    def group_for(self, path: str) -> Optional[RouteGroup]:
+        for group in self.groups:
+            if group.matches(path):
+                return group
+        return None
+
+    def limiters(self):
+        if self.global_limiter is not None:
+            yield self.global_limiter
+        for group in self.groups:
+            if group.limiter is not None:
+                yield group.limiter
+
+    def stats(self):
+        return {
+            "limiters": {limiter.name: limiter.stats() for limiter in self.limiters()},
+            "users": self.user_limiter.stats() if self.user_limiter else None,
+        }
+
+    def render(self):
+        """Prometheus exposition lines, labelled by limiter."""
+        lines = [
+            "# HELP admission_active Requests currently admitted, by limiter.",
+            "# TYPE admission_active gauge",
+        ]
+        lines += [f'admission_active{{limiter="{l.name}"}} {l.active}' for l in self.limiters()]
+        lines += [
+            "# HELP admission_waiting Requests queued for a slot, by limiter.",
+            "# TYPE admission_waiting gauge",
+        ]
+        lines += [f'admission_waiting{{limiter="{l.name}"}} {l.waiting}' for l in self.limiters()]
+        lines += [
+            "# HELP admission_shed_total Requests turned away, by limiter and reason.",
+            "# TYPE admission_shed_total counter",
+        ]
+        for l in self.limiters():
+            lines.append(f'admission_shed_total{{limiter="{l.name}",reason="queue_full"}} {l.shed_queue_full}')
+            lines.append(f'admission_shed_total{{limiter="{l.name}",reason="timeout"}} {l.shed_timeout}')
+        if self.user_limiter is not None:
+            lines.append(
+                f'admission_shed_total{{limiter="user",reason="rate_limited"}} {self.user_limiter.limited}'
+            )
+        return lines
+
+
+def retry_after(seconds: float) -> str:
+    """Whole seconds, jittered upwards so shed clients don't all retry in the
+    same instant and recreate the spike."""
+    return str(max(1, math.ceil(seconds * random.uniform(1, 2))))
+
+
+async def reject(send, status_code: int, detail: str, retry_seconds: float):
+    body = orjson.dumps({"detail": detail})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", retry_after(retry_seconds).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def _limiter(name: str, max_concurrent: int):
+    if max_concurrent <= 0:
+        return None
+    return ConcurrencyLimiter(
+        name,
+        max_concurrent,
+        max_queue=settings.admission_queue_size,
+        queue_timeout=settings.admission_queue_timeout,
+    )
+
+
+admission_control = AdmissionControl(
+    global_limiter=_limiter("global", settings.admission_max_concurrent),
+    groups=[
+        RouteGroup(
+            "check_in",
+            ("/record_attendance/", "/record_attendance/batch/"),
+            _limiter("check_in", settings.admission_check_in_concurrency),
+        ),
+        # Logins are bcrypt-bound and carry no token yet
+        RouteGroup(
+            "login",
+            ("/auth/token/",),
+            _limiter("login", settings.admission_login_concurrency),
+            per_user=False,
+        ),
+        # Open feeds are capped by the feed itself (ATTENDANCE_FEED_MAX_SUBSCRIBERS)
+        RouteGroup("feed", ("/attendance_feed/",), None, per_user=False, streaming=True),
+        RouteGroup(
+            "export",
+            ("/export_attendance/",),
+            _limiter("export", settings.admission_export_concurrency),
+            streaming=True,
+        ),
+    ],
+    user_limiter=(
+        UserRateLimiter(settings.admission_user_rate, settings.admission_user_burst)
+        if settings.admission_user_rate > 0
+        else None
+    ),
+    exempt_paths=("/metrics",),
+)
+
+
+class AdmissionControlMiddleware:
+    """Plain ASGI middleware that sheds load before it reaches the routes.
+
+    Every HTTP request passes the global limiter, except those of streaming
+    groups; requests to an expensive route group then spend a token from
+    their user's bucket (429 when empty) and take a slot in the group's
+    limiter (503 when the queue is full or the wait times out). Both carry
+    Retry-After.
+    """
+
+    def __init__(self, app, control: AdmissionControl = admission_control):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in self.control.exempt_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        group = self.control.group_for(scope["path"])
+        user_limiter = self.control.user_limiter
+        if group is not None and group.per_user and user_limiter is not None:
+            user_matric = bearer_user_matric(scope)
+            if user_matric is not None:
+                wait = user_limiter.take(user_matric)
+                if wait:
+                    await reject(send, 429, "Too many requests. Please slow down.", wait)
+                    return
+
+        limiters = [group.limiter] if group is not None else []
+        if group is None or not group.streaming:
+            limiters.insert(0, self.control.global_limiter)
+        acquired = []
+        try:
+            for limiter in limiters:
+                if limiter is None:
+                    continue
+                if not await limiter.acquire():
+                    await reject(
+                        send, 503, "Server is busy. Please retry shortly.", limiter.queue_timeout
+                    )
+                    return
+                acquired.append(limiter)
+            await self.app(scope, receive, send)
+        finally:
+            for limiter in reversed(acquired):
+                limiter.release()
@@ -0,0 +1,169 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.settings import settings
+
+logger = logging.getLogger("app.sql")
+
+# Stats of the request currently running in this context (None outside requests).
+# Starlette copies the context into the threadpool, so sync routes see it too.
+_current_stats: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+
+
+def redact(parameters):
+    """Parameter types only; values may hold matric numbers, emails or hashes."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(value) for value in parameters]
+    return type(parameters).__name__
+
+
+class QueryStats:
+    """Queries run while serving one request."""
+
+    __slots__ = ("count", "seconds", "duplicates", "_seen")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.duplicates = 0
+        self._seen = set()
+
+    def record(self, statement, parameters, seconds):
+        self.count += 1
+        self.seconds += seconds
+        # Same statement with the same parameters twice in one request
+        key = (statement, repr(parameters))
+        if key in self._seen:
+            self.duplicates += 1
+        else:
+            self._seen.add(key)
+
+
+class RouteQueryStats:
+    __slots__ = ("requests", "queries", "max_queries", "seconds", "duplicates")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.seconds = 0.0
+        self.duplicates = 0
+
+    def add(self, stats: QueryStats):
+        self.requests += 1
+        self.queries += stats.count
+        self.max_queries = max(self.max_queries, stats.count)
+        self.seconds += stats.seconds
+        self.duplicates += stats.duplicates
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "queries_per_request": self.queries / self.requests if self.requests else 0.0,
+            "max_queries": self.max_queries,
+            "db_seconds": self.seconds,
+            "duplicate_queries": self.duplicates,
+        }
+
+
+class QueryProfiler:
+    """Counts queries and DB time per request from cursor execute events,
+    aggregates them per route, and logs statements slower than the threshold."""
+
+    def __init__(self, slow_query_seconds: float = 0.2):
+        self.slow_query_seconds = slow_query_seconds
+        self.routes: dict[str, RouteQueryStats] = {}
+
+    def install(self, engine):
+        """Listens on a sync Engine (pass async_engine.sync_engine for async)."""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, parameters, elapsed)
+        if elapsed >= self.slow_query_seconds:
+            logger.warning(
+                "Slow query (%.1f ms): %s | params: %s",
+                elapsed * 1000,
+                " ".join(statement.split()),
+                redact(parameters),
+            )
+
+    @contextmanager
+    def profile(self):
+        """Collects the queries run inside the block into a QueryStats."""
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            _current_stats.reset(token)
+
+    def record_request(self, route: str, stats: QueryStats):
+        route_stats = self.routes.get(route)
+        if route_stats is None:
+            route_stats = self.routes[route] = RouteQueryStats()
+        route_stats.add(stats)
+
+    def route_stats(self):
+        """Per-endpoint query stats, e.g. for asserting query budgets in CI."""
+        return {route: stats.as_dict() for route, stats in self.routes.items()}
+
+    def reset(self):
+        self.routes.clear()
+
+    def render(self):
+        """Prometheus lines for the /metrics endpoint."""
+        series = [
+            ("db_queries_total", "counter", "SQL statements executed, by route.", "queries"),
+            ("db_query_seconds_total", "counter", "Time spent in SQL statements, by route.", "seconds"),
+            ("db_duplicate_queries_total", "counter", "Repeated identical statements within one request, by route.", "duplicates"),
+            ("db_queries_max_per_request", "gauge", "Most statements seen in a single request, by route.", "max_queries"),
+            ("db_profiled_requests_total", "counter", "Requests profiled, by route.", "requests"),
+        ]
+        lines = []
+        for name, kind, help, attribute in series:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for route, stats in self.routes.items():
+                lines.append(f'{name}{{route="{route}"}} {getattr(stats, attribute)}')
+        return lines
+
+
+query_profiler = QueryProfiler(
+    slow_query_seconds=settings.slow_query_ms / 1000
+)
+
+
+class QueryProfilerMiddleware:
+    """Gives every HTTP request its own QueryStats and files it under the
+    matched route template when the request finishes."""
+
+    def __init__(self, app, profiler: QueryProfiler = query_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with self.profiler.profile() as stats:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                self.profiler.record_request(f'{scope["method"]} {route}', stats)
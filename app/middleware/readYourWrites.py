@@ -0,0 +1,37 @@
+from app.database.replicas import ReplicaSet, replica_set
+from app.middleware.admissionControl import bearer_user_matric
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReadYourWritesMiddleware:
+    """Tags each request with its user's matric so read dependencies can tell
+    whose read it is, and pins that user's reads to the primary once one of
+    their writes succeeds. The pin is taken before the response is sent, so a
+    read issued straight after it can't reach a lagging replica.
+    """
+
+    def __init__(self, app, replicas: ReplicaSet = replica_set):
+        self.app = app
+        self.replicas = replicas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        user_matric = bearer_user_matric(scope)
+        if user_matric is None:
+            await self.app(scope, receive, send)
+            return
+        scope.setdefault("state", {})["user_matric"] = user_matric
+        if scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                self.replicas.record_write(user_matric)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,166 @@
+import time
+from bisect import bisect_left
+
+from app.database.replicas import replica_set
+from app.database.session import async_engine, engine
+
+# Seconds; tuned for API latencies from a few ms up to slow exports
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Request counters and latency histograms keyed by (method, route, status).
+
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.latency: dict[tuple[str, str, int], Histogram] = {}
+        self.in_flight = 0
+        self.gauges = []
+        self.collectors = []
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, status)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+        histogram.observe(seconds)
+
+    def register_gauge(self, name: str, help: str, read, kind: str = "gauge"):
+        """Adds a value read at scrape time, e.g. a queue depth or cache hit count.
+        Pass kind="counter" for monotonically increasing values."""
+        self.gauges.append((name, help, read, kind))
+
+    def register_collector(self, collect):
+        """Adds a callable returning ready-made exposition lines, for labelled
+        series that do not fit a single gauge."""
+        self.collectors.append(collect)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Requests served, by route template and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), histogram in self.latency.items():
+            labels = f'method="{method}",route="{route}",status="{status}"'
+            lines.append(f"http_requests_total{{{labels}}} {histogram.count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Request latency, by route template and status.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), histogram in self.latency.items():
+            labels = f'method="{method}",route="{route}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}'
+            )
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines += pool_metrics()
+
+        for name, help, read, kind in self.gauges:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {read()}"]
+        for collect in self.collectors:
+            lines += collect()
+        return "\n".join(lines) + "\n"
+
+
+def pool_metrics():
+    pools = {"sync": engine.pool, "async": async_engine.pool}
+    for replica in replica_set.replicas:
+        pools[f"{replica.name}_sync"] = replica.engine.pool
+        pools[f"{replica.name}_async"] = replica.async_engine.pool
+    series = {
+        "db_pool_size": ("Configured pool size.", lambda pool: pool.size()),
+        "db_pool_checked_out": (
+            "Connections currently checked out.",
+            lambda pool: pool.checkedout(),
+        ),
+        # QueuePool counts overflow from -pool_size, so clamp to connections over the limit
+        "db_pool_overflow": (
+            "Connections open beyond pool_size.",
+            lambda pool: max(pool.overflow(), 0),
+        ),
+    }
+    lines = []
+    for name, (help, read) in series.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        for label, pool in pools.items():
+            if hasattr(pool, "checkedout"):
+                lines.append(f'{name}{{engine="{label}"}} {read(pool)}')
+    counters = {
+        "db_pool_checkouts_total": ("Connection checkouts.", "checkouts"),
+        "db_pool_checkout_wait_seconds_total": (
+            "Time spent waiting for a pooled connection.",
+            "wait_seconds",
+        ),
+    }
+    for name, (help, attribute) in counters.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+        for label, pool in pools.items():
+            if hasattr(pool, attribute):
+                lines.append(f'{name}{{engine="{label}"}} {getattr(pool, attribute)}')
+    return lines
+
+
+metrics = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    """Plain ASGI middleware (no BaseHTTPMiddleware task overhead) that times
+    every HTTP request and labels it with the matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't blow up cardinality
+            template = getattr(route, "path", None) or "unmatched"
+            metrics.observe(
+                scope["method"], template, status_code, time.perf_counter() - start
+            )
@@ -1,3 +1,6 @@
 from .user import User
 from .geofence import Geofence
 from .attendanceRecord import AttendanceRecord
+from .attendanceAggregate import CourseSessionAttendance, CourseStudentAttendance
+from .geofenceSetVersion import GeofenceSetVersion
+from .tokenRevocation import TokenRevocation
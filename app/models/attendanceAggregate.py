@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Date, DateTime, Integer, String
+
+from app.database.session import Base
+
+
+class CourseSessionAttendance(Base):
+    """Check-ins per course per day, kept current as attendance is recorded."""
+
+    __tablename__ = "CourseSessionAttendance"
+
+    geofence_name = Column(String(60), primary_key=True)
+    session_date = Column(Date, primary_key=True)
+    check_ins = Column(Integer, nullable=False, default=0)
+
+
+class CourseStudentAttendance(Base):
+    """Check-ins per course per student, kept current as attendance is recorded."""
+
+    __tablename__ = "CourseStudentAttendance"
+
+    geofence_name = Column(String(60), primary_key=True)
+    user_matric = Column(String(50), primary_key=True)
+    check_ins = Column(Integer, nullable=False, default=0)
+    last_check_in = Column(DateTime(timezone=True))
@@ -2,6 +2,7 @@ from sqlalchemy import (
     Boolean,
     Column,
     ForeignKey,
+    Index,
     Integer,
     String,
     Float,
@@ -15,6 +16,12 @@ from app.database.session import Base
 
 class AttendanceRecord(Base):
     __tablename__ = "AttendanceRecords"
+    __table_args__ = (
+        Index("ix_attendance_geofence_name_timestamp", "geofence_name", "timestamp"),
+        Index("ix_attendance_user_matric_fence_code", "user_matric", "fence_code"),
+        Index("ix_attendance_user_matric_timestamp", "user_matric", "timestamp"),
+        Index("uq_attendance_matric_fence_code", "matric_fence_code", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_matric = Column(String(50), ForeignKey("Users.user_matric"))
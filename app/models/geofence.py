@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Float, DateTime
 from sqlalchemy.orm import relationship
 
 from app.database.session import Base
@@ -6,6 +6,16 @@ from app.database.session import Base
 
 class Geofence(Base):
     __tablename__ = "Geofences"
+    __table_args__ = (
+        # "course on a given day" lookups (get_attendance, create, deactivate)
+        Index("ix_geofences_name_start_time", "name", "start_time"),
+        Index("ix_geofences_creator_matric_start_time", "creator_matric", "start_time"),
+        # newest-first keyset pagination of the listings
+        Index("ix_geofences_time_created", "time_created", "id"),
+        Index(
+            "ix_geofences_creator_matric_time_created", "creator_matric", "time_created"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     fence_code = Column(String(15), unique=True)
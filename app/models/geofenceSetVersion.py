@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, Column, Integer
+
+from app.database.session import Base
+
+
+class GeofenceSetVersion(Base):
+    """Single row counting changes to the geofence set. Bumped in the same
+    transaction as every create, deactivation and status transition, so all
+    workers derive the same listing ETags from it."""
+
+    __tablename__ = "GeofenceSetVersion"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
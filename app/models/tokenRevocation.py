@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, String
+from sqlalchemy.dialects import mysql
+
+from app.database.session import Base
+
+
+class TokenRevocation(Base):
+    """Per-user cutoff: tokens issued to the user at or before `revoked_at`
+    (naive UTC) are no longer accepted."""
+
+    __tablename__ = "TokenRevocations"
+
+    user_matric = Column(String(50), primary_key=True)
+    # Microseconds, like the iat it is compared with; MySQL keeps whole
+    # seconds unless asked
+    revoked_at = Column(DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"), nullable=False)
@@ -1,3 +1,10 @@
 from .user import CreateUserRequest
-from .geofence import GeofenceCreate
-from .accessToken import Token, TokenData
\ No newline at end of file
+from .geofence import GeofenceCreate, GeofenceOut, GeofenceList
+from .accessToken import Token, TokenData
+from .attendanceRecord import (
+    OfflineCheckIn,
+    BatchCheckInRequest,
+    AttendanceRecordOut,
+    AttendanceSummary,
+    CourseAttendanceSummary,
+)
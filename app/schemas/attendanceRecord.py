@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class OfflineCheckIn(BaseModel):
+    fence_code: str
+    lat: float
+    long: float
+    client_timestamp: datetime
+
+
+class BatchCheckInRequest(BaseModel):
+    check_ins: list[OfflineCheckIn] = Field(min_length=1, max_length=500)
+
+
+class AttendanceRecordOut(BaseModel):
+    id: int
+    user_matric: str
+    fence_code: str
+    geofence_name: str
+    timestamp: datetime
+    matric_fence_code: str
+
+    class Config:
+        from_attributes = True
+
+
+class CourseAttendanceSummary(BaseModel):
+    course: str
+    check_ins: int
+    first_attendance: datetime
+    last_attendance: datetime
+
+
+class AttendanceSummary(BaseModel):
+    user_matric: str
+    total_check_ins: int
+    courses: list[CourseAttendanceSummary]
@@ -14,3 +14,25 @@ class GeofenceCreate(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class GeofenceOut(BaseModel):
+    id: int
+    fence_code: str
+    name: str
+    latitude: float
+    longitude: float
+    radius: float
+    fence_type: str
+    start_time: datetime
+    end_time: datetime
+    status: str
+    time_created: datetime
+    creator_matric: str
+
+    class Config:
+        from_attributes = True
+
+
+class GeofenceList(BaseModel):
+    geofences: list[GeofenceOut]
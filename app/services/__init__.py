@@ -0,0 +1,14 @@
+from .geofenceCache import ActiveGeofence, GeofenceCache, active_geofences
+from .attendanceWriter import AttendanceWriter, WriteBehindFull, attendance_writer
+from .passwordHasher import PasswordHasher, password_hasher
+from .tokenCache import TokenCache, token_cache
+from .tokenRevocations import TokenRevocations, token_revocations
+from .geofenceScheduler import GeofenceScheduler, geofence_scheduler, utc_naive, utc_now
+from .fenceSet import FenceSet, within_radius
+from .spatialIndex import GridIndex
+from .activeFences import ActiveFenceSnapshot, ActiveFences, active_fences
+from .checkInRegistry import CheckInRegistry, check_in_registry
+from .attendanceAggregates import aggregate_upserts, rebuild_aggregates, record_check_ins
+from .attendanceFeed import AttendanceFeed, FeedFull, attendance_feed
+from .geofenceVersion import GeofenceVersion, geofence_version
+from .sharedFenceTable import SharedFenceTable, shared_fences
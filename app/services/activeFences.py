@@ -0,0 +1,95 @@
+import time
+from functools import cached_property
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.models.geofence import Geofence
+from app.services.fenceSet import FenceSet
+from app.services.geofenceCache import ActiveGeofence
+from app.services.spatialIndex import GridIndex
+from app.settings import settings
+from app.utils.haversine import haversine
+
+
+class ActiveFenceSnapshot:
+    """Immutable view of the active geofences as loaded by one query. The
+    FenceSet arrays and the GridIndex are both derived from it, on first use."""
+
+    def __init__(self, fences=()):
+        self.by_code = {fence.fence_code: fence for fence in fences}
+
+    def __len__(self):
+        return len(self.by_code)
+
+    @cached_property
+    def fence_set(self) -> FenceSet:
+        return FenceSet(self.by_code.values())
+
+    @cached_property
+    def grid(self) -> GridIndex:
+        return GridIndex(self.by_code.values())
+
+    def without(self, fence_code: str) -> "ActiveFenceSnapshot":
+        snapshot = ActiveFenceSnapshot()
+        snapshot.by_code = {code: f for code, f in self.by_code.items() if code != fence_code}
+        return snapshot
+
+    def radius_check(self, fence_code: str, lat: float, lng: float) -> Optional[bool]:
+        """True if the fence contains the point, None if the fence isn't in
+        the snapshot (the caller then has to look it up itself)."""
+        fence = self.by_code.get(fence_code)
+        if fence is None:
+            return None
+        return haversine(lat, lng, fence.latitude, fence.longitude) <= fence.radius
+
+
+class ActiveFences:
+    """This worker's snapshot of the active geofences.
+
+    Deactivations are applied by swapping in a snapshot without the fence;
+    anything else marks it stale and it is reloaded from one query on the
+    next `get`, or after `ttl` seconds to catch changes made by other workers.
+    """
+
+    def __init__(self, ttl: float = 30):
+        self.ttl = ttl
+        self.reloads = 0
+        self._snapshot = ActiveFenceSnapshot()
+        self._loaded_at = None
+        self._generation = 0
+
+    @property
+    def fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.ttl
+
+    def peek(self) -> Optional[ActiveFenceSnapshot]:
+        """The current snapshot if it is fresh, without touching the database."""
+        return self._snapshot if self.fresh else None
+
+    def invalidate(self):
+        self._generation += 1
+        self._loaded_at = None
+
+    def remove(self, fence_code: str):
+        self._generation += 1
+        self._snapshot = self._snapshot.without(fence_code)
+
+    async def get(self, db) -> ActiveFenceSnapshot:
+        if self.fresh:
+            return self._snapshot
+        while True:
+            generation, loaded_at = self._generation, time.monotonic()
+            rows = await db.scalars(select(Geofence).filter(Geofence.status == "active"))
+            # Rows read before an invalidation or removal landed mid-query may
+            # still hold the change's old state, so they are queried again
+            # rather than swapped in over it
+            if generation == self._generation:
+                break
+        self._snapshot = ActiveFenceSnapshot(ActiveGeofence.from_orm(row) for row in rows)
+        self._loaded_at = loaded_at
+        self.reloads += 1
+        return self._snapshot
+
+
+active_fences = ActiveFences(ttl=settings.geofence_cache_ttl)
@@ -0,0 +1,115 @@
+from collections import Counter
+from functools import lru_cache
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.attendanceAggregate import CourseSessionAttendance, CourseStudentAttendance
+from app.models.attendanceRecord import AttendanceRecord
+
+
+@lru_cache(maxsize=None)
+def _upsert(dialect: str, model, increment: str, latest: str = None):
+    """INSERT that adds `increment` onto an existing row (and keeps the newest
+    `latest`) instead of failing on the primary key.
+
+    Built without values and executed with a parameter list, so it compiles
+    once per dialect instead of once per call.
+    """
+    table = model.__table__
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(table)
+        updates = {increment: table.c[increment] + stmt.inserted[increment]}
+        if latest:
+            updates[latest] = func.greatest(table.c[latest], stmt.inserted[latest])
+        return stmt.on_duplicate_key_update(**updates)
+    stmt = sqlite.insert(table)
+    updates = {increment: table.c[increment] + stmt.excluded[increment]}
+    if latest:
+        # SQLite's two-argument max() is its GREATEST
+        updates[latest] = func.max(table.c[latest], stmt.excluded[latest])
+    return stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key], set_=updates
+    )
+
+
+def aggregate_upserts(dialect: str, records):
+    """(statement, parameters) pairs that fold `records` into the aggregate
+    tables. Rows are pre-summed per key, so a batch from the write-behind
+    queue costs one statement per table rather than one per check-in."""
+    sessions = Counter()
+    students = {}
+    for record in records:
+        timestamp = record["timestamp"]
+        sessions[record["geofence_name"], timestamp.date()] += 1
+        key = (record["geofence_name"], record["user_matric"])
+        count, last = students.get(key, (0, timestamp))
+        students[key] = (count + 1, max(last, timestamp))
+
+    return [
+        (
+            _upsert(dialect, CourseSessionAttendance, "check_ins"),
+            [
+                {"geofence_name": name, "session_date": day, "check_ins": count}
+                for (name, day), count in sessions.items()
+            ],
+        ),
+        (
+            _upsert(dialect, CourseStudentAttendance, "check_ins", "last_check_in"),
+            [
+                {
+                    "geofence_name": name,
+                    "user_matric": matric,
+                    "check_ins": count,
+                    "last_check_in": last,
+                }
+                for (name, matric), (count, last) in students.items()
+            ],
+        ),
+    ]
+
+
+async def record_check_ins(conn, records):
+    """Folds newly inserted attendance rows into the aggregate tables.
+
+    Call it in the same transaction as the insert so the two commit or roll
+    back together.
+    """
+    if not records:
+        return
+    # An AsyncSession (route handlers) or AsyncConnection (write-behind flush)
+    bind = conn.get_bind() if isinstance(conn, AsyncSession) else conn
+    for stmt, rows in aggregate_upserts(bind.dialect.name, records):
+        await conn.execute(stmt, rows)
+
+
+def rebuild_aggregates(conn):
+    """Recomputes both aggregate tables from AttendanceRecords (sync connection)."""
+    records = AttendanceRecord.__table__
+    recorded = (records.c.geofence_name.is_not(None), records.c.timestamp.is_not(None))
+    session_date = func.date(records.c.timestamp)
+
+    conn.execute(delete(CourseSessionAttendance))
+    conn.execute(delete(CourseStudentAttendance))
+    conn.execute(
+        insert(CourseSessionAttendance).from_select(
+            ["geofence_name", "session_date", "check_ins"],
+            select(records.c.geofence_name, session_date, func.count())
+            .where(*recorded)
+            .group_by(records.c.geofence_name, session_date),
+        )
+    )
+    conn.execute(
+        insert(CourseStudentAttendance).from_select(
+            ["geofence_name", "user_matric", "check_ins", "last_check_in"],
+            select(
+                records.c.geofence_name,
+                records.c.user_matric,
+                func.count(),
+                func.max(records.c.timestamp),
+            )
+            .where(*recorded)
+            .group_by(records.c.geofence_name, records.c.user_matric),
+        )
+    )
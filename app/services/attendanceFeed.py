@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.settings import settings
+
+# Sentinels delivered in place of an event
+CLOSED = {"type": "closed"}
+DROPPED = {"type": "dropped"}
+
+
+class FeedFull(Exception):
+    """Raised when the worker already serves the maximum number of subscribers."""
+
+
+class Subscription:
+    def __init__(self, fence_code: str, queue_size: int):
+        self.fence_code = fence_code
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class AttendanceFeed:
+    """In-process pub/sub of recorded check-ins, fanned out per fence_code.
+
+    Each subscriber has a bounded queue. One that falls `queue_size` events
+    behind is dropped: its queue is replaced by a single DROPPED event, so a
+    stalled client can't hold memory or slow down publishing. Subscribers only
+    see check-ins recorded by this worker.
+    """
+
+    def __init__(self, queue_size: int = 256, max_subscribers: int = 1000):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def subscriber_count(self):
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def subscribe(self, fence_code: str) -> Subscription:
+        if self.subscriber_count >= self.max_subscribers:
+            raise FeedFull()
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(fence_code, self.queue_size)
+        self._subscribers.setdefault(fence_code, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscribers.get(subscription.fence_code)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.fence_code]
+
+    def publish(self, fence_code: str, event: dict):
+        """Fans an event out to the fence's subscribers. Safe to call from the
+        threadpool; delivery always happens on the event loop."""
+        if fence_code not in self._subscribers or self._loop is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._deliver(fence_code, event)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, fence_code, event)
+
+    def close(self, fence_code: str):
+        """Ends every subscription to a fence, e.g. once it is deactivated."""
+        self.publish(fence_code, CLOSED)
+
+    def _deliver(self, fence_code: str, event: dict):
+        subscriptions = self._subscribers.get(fence_code, ())
+        for subscription in list(subscriptions):
+            if event is CLOSED:
+                self._replace_queue(subscription, CLOSED)
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logging.warning(f"Dropping slow attendance feed subscriber of {fence_code}")
+                self._replace_queue(subscription, DROPPED)
+                self.dropped += 1
+        if event is CLOSED:
+            self._subscribers.pop(fence_code, None)
+        else:
+            self.published += 1
+
+    def _replace_queue(self, subscription: Subscription, final_event: dict):
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(final_event)
+
+    def stats(self):
+        return {
+            "fences": len(self._subscribers),
+            "subscribers": self.subscriber_count,
+            "max_subscribers": self.max_subscribers,
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+attendance_feed = AttendanceFeed(
+    queue_size=settings.attendance_feed_queue_size,
+    max_subscribers=settings.attendance_feed_max_subscribers,
+)
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.database.session import async_engine
+from app.models.attendanceRecord import AttendanceRecord
+from app.services.attendanceAggregates import record_check_ins
+from app.settings import settings
+from app.utils.isDuplicateEntry import is_duplicate_entry
+
+_STOP = object()
+
+
+class WriteBehindFull(Exception):
+    """Raised when the queue stays full for longer than the enqueue timeout."""
+
+
+class AttendanceWriter:
+    """Write-behind queue for AttendanceRecord rows.
+
+    Check-ins are queued as plain dicts and a background task writes them in
+    multi-row INSERTs once `batch_size` rows are waiting or `max_latency`
+    seconds have passed since the first one. Keys of queued rows are held in
+    `pending` until their batch commits, so duplicates can be rejected before
+    the row reaches the database. A record's `on_commit` callback runs once
+    its row is committed, and never if it isn't.
+
+    Rows that fail for any reason other than an integrity error (a dropped
+    connection, a lock timeout) are retried up to `max_retries` times with
+    backoff. A unique key violation means the row is already stored. Rows
+    that still can't be written are handed to the drop listeners, since the
+    client was already told they were recorded.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        queue_size: int = 5000,
+        batch_size: int = 200,
+        max_latency: float = 0.05,
+        enqueue_timeout: float = 0.5,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        self.enabled = enabled
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.pending: set[str] = set()
+        self._on_commit: dict[str, Callable[[], None]] = {}
+        self.drop_listeners = []
+        self.flushed = 0
+        self.duplicates = 0
+        self.retried = 0
+        self.failed = 0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.enabled or self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flushes everything already queued, then stops the flusher."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def reserve(self, matric_fence_code: str):
+        """Claims a check-in key; False if it is already queued or in flight."""
+        if matric_fence_code in self.pending:
+            return False
+        self.pending.add(matric_fence_code)
+        return True
+
+    def release(self, matric_fence_code: str):
+        self.pending.discard(matric_fence_code)
+        self._on_commit.pop(matric_fence_code, None)
+
+    def add_drop_listener(self, listener):
+        """Registers listener(records), called with the records that could not
+        be written even after retrying."""
+        self.drop_listeners.append(listener)
+
+    async def submit(self, record: dict, on_commit: Optional[Callable[[], None]] = None):
+        """Queues a reserved record, waiting at most `enqueue_timeout` for room."""
+        if on_commit is not None:
+            self._on_commit[record["matric_fence_code"]] = on_commit
+        try:
+            await asyncio.wait_for(self._queue.put(record), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise WriteBehindFull()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "pending": len(self.pending),
+            "flushed": self.flushed,
+            "duplicates": self.duplicates,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_latency
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(insert(AttendanceRecord), batch)
+                await record_check_ins(conn, batch)
+            self.flushed += len(batch)
+            self._committed(batch)
+        except Exception as e:
+            # One bad row fails the whole statement, so salvage the rest one by one
+            logging.error(f"Attendance batch insert failed, retrying row by row: {e}")
+            await self._flush_rows(batch)
+        finally:
+            for record in batch:
+                self.release(record["matric_fence_code"])
+
+    def _committed(self, records):
+        for record in records:
+            on_commit = self._on_commit.pop(record["matric_fence_code"], None)
+            if on_commit is None:
+                continue
+            try:
+                on_commit()
+            except Exception as e:
+                logging.error(f"Attendance commit callback failed: {e}")
+
+    async def _flush_rows(self, records):
+        dropped = []
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retried += len(records)
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            failed = []
+            for record in records:
+                try:
+                    async with async_engine.begin() as conn:
+                        await conn.execute(insert(AttendanceRecord).values(record))
+                        await record_check_ins(conn, [record])
+                    self.flushed += 1
+                    self._committed([record])
+                except IntegrityError as e:
+                    if is_duplicate_entry(e):
+                        # Stored already, e.g. by another worker
+                        self.duplicates += 1
+                    else:
+                        # Retrying won't fix a constraint violation
+                        dropped.append((record, e))
+                except Exception as e:
+                    failed.append((record, e))
+            records = [record for record, _ in failed]
+            if not records:
+                break
+        dropped += failed
+
+        for record, e in dropped:
+            self.failed += 1
+            logging.error(f"Dropped attendance record {record}: {e}")
+        if dropped:
+            for listener in self.drop_listeners:
+                try:
+                    listener([record for record, _ in dropped])
+                except Exception as e:
+                    logging.error(f"Attendance drop listener failed: {e}")
+
+attendance_writer = AttendanceWriter(
+    enabled=settings.attendance_write_behind,
+    queue_size=settings.attendance_queue_size,
+    batch_size=settings.attendance_batch_size,
+    max_latency=settings.attendance_flush_interval,
+    enqueue_timeout=settings.attendance_enqueue_timeout,
+    max_retries=settings.attendance_flush_retries,
+    retry_delay=settings.attendance_flush_retry_delay,
+)
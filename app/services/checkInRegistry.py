@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from app.models.attendanceRecord import AttendanceRecord
+from app.settings import settings
+
+
+class CheckInRegistry:
+    """Matrics already checked in to each recently used fence, on this worker.
+
+    A fence's set is warmed from the DB once, then kept current as check-ins
+    succeed here, so a repeat submission is rejected without any query. Only
+    positive answers are trusted: check-ins recorded by other workers since
+    warming are missing from the set and fall through to the unique index.
+    """
+
+    def __init__(self, max_fences: int = 256):
+        self.max_fences = max_fences
+        self._fences: "OrderedDict[str, set[str]]" = OrderedDict()
+        self._warmed: set[str] = set()
+        self._warming: set[str] = set()
+        # deactivation runs in the threadpool, check-ins on the event loop
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.warms = 0
+        self.evictions = 0
+
+    def contains(self, fence_code: str, user_matric: str) -> bool:
+        with self._lock:
+            matrics = self._fences.get(fence_code)
+            if matrics is None or user_matric not in matrics:
+                return False
+            self._fences.move_to_end(fence_code)
+            self.hits += 1
+            return True
+
+    def add(self, fence_code: str, user_matric: str):
+        with self._lock:
+            matrics = self._fences.get(fence_code)
+            if matrics is None:
+                matrics = self._fences[fence_code] = set()
+                self._evict()
+            matrics.add(user_matric)
+
+    def remove(self, fence_code: str, user_matric: str):
+        """Forgets one check-in, e.g. one that was never stored after all."""
+        with self._lock:
+            matrics = self._fences.get(fence_code)
+            if matrics is not None:
+                matrics.discard(user_matric)
+
+    async def warm(self, db, fence_code: str):
+        """Loads the fence's existing check-ins once. Concurrent first callers
+        don't wait on each other; they fall back to the usual DB checks."""
+        with self._lock:
+            if fence_code in self._warmed or fence_code in self._warming:
+                return
+            self._warming.add(fence_code)
+        try:
+            recorded = set(
+                await db.scalars(
+                    select(AttendanceRecord.user_matric).filter(
+                        AttendanceRecord.fence_code == fence_code
+                    )
+                )
+            )
+        finally:
+            with self._lock:
+                self._warming.discard(fence_code)
+        with self._lock:
+            # Keep anything added while the query ran
+            self._fences.setdefault(fence_code, set()).update(recorded)
+            self._fences.move_to_end(fence_code)
+            self._warmed.add(fence_code)
+            self.warms += 1
+            self._evict()
+
+    def discard(self, fence_code: str):
+        """Forgets a fence, e.g. once it is no longer active."""
+        with self._lock:
+            self._fences.pop(fence_code, None)
+            self._warmed.discard(fence_code)
+
+    def clear(self):
+        with self._lock:
+            self._fences.clear()
+            self._warmed.clear()
+
+    def _evict(self):
+        while len(self._fences) > self.max_fences:
+            fence_code, _ = self._fences.popitem(last=False)
+            self._warmed.discard(fence_code)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "fences": len(self._fences),
+                "max_fences": self.max_fences,
+                "check_ins": sum(len(matrics) for matrics in self._fences.values()),
+                "repeats_rejected": self.hits,
+                "warms": self.warms,
+                "evictions": self.evictions,
+            }
+
+
+check_in_registry = CheckInRegistry(
+    max_fences=settings.checkin_registry_max_fences
+)
@@ -0,0 +1,61 @@
+import numpy as np
+
+from app.utils.haversine import EARTH_RADIUS_M
+
+
+def haversine_threshold(radius):
+    """sin^2(d / 2R) for a distance d; comparing haversine terms against this
+    is equivalent to comparing distances, without the sqrt/atan2 per pair."""
+    return np.sin(np.asarray(radius, dtype=np.float64) / (2 * EARTH_RADIUS_M)) ** 2
+
+
+def haversine_term(lat1, lng1, lat2, lng2):
+    """Vectorised haversine 'a' term; inputs in degrees, broadcast like NumPy."""
+    lat1, lng1, lat2, lng2 = (
+        np.radians(np.asarray(value, dtype=np.float64))
+        for value in (lat1, lng1, lat2, lng2)
+    )
+    return (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+
+
+def within_radius(lat1, lng1, lat2, lng2, radius):
+    """Element-wise `haversine(lat1, lng1, lat2, lng2) <= radius`."""
+    return haversine_term(lat1, lng1, lat2, lng2) <= haversine_threshold(radius)
+
+
+class FenceSet:
+    """Immutable set of fences with centres and radii in contiguous arrays,
+    so a point (or many) is tested against every fence in one NumPy pass."""
+
+    def __init__(self, fences=()):
+        self.fences = list(fences)
+        lat = np.radians(np.fromiter((f.latitude for f in self.fences), np.float64))
+        self.lat = lat
+        self.lng = np.radians(
+            np.fromiter((f.longitude for f in self.fences), np.float64)
+        )
+        self.cos_lat = np.cos(lat)
+        self.threshold = haversine_threshold(
+            np.fromiter((f.radius for f in self.fences), np.float64)
+        )
+
+    def __len__(self):
+        return len(self.fences)
+
+    def contains(self, lats, lngs):
+        """Boolean matrix of shape (points, fences): point i is inside fence j."""
+        lat = np.radians(np.atleast_1d(np.asarray(lats, dtype=np.float64)))[:, None]
+        lng = np.radians(np.atleast_1d(np.asarray(lngs, dtype=np.float64)))[:, None]
+        a = (
+            np.sin((self.lat - lat) / 2) ** 2
+            + np.cos(lat) * self.cos_lat * np.sin((self.lng - lng) / 2) ** 2
+        )
+        return a <= self.threshold
+
+    def containing(self, lat: float, lng: float):
+        """Fences whose circle contains the point."""
+        mask = self.contains(lat, lng)[0]
+        return [self.fences[i] for i in np.flatnonzero(mask)]
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from app.models.geofence import Geofence
+from app.settings import settings
+
+
+@dataclass(frozen=True)
+class ActiveGeofence:
+    """Detached snapshot of an active Geofence row, safe to share across sessions."""
+
+    id: int
+    fence_code: str
+    name: str
+    latitude: float
+    longitude: float
+    radius: float
+    start_time: datetime
+    end_time: datetime
+    status: str
+    creator_matric: str
+
+    @classmethod
+    def from_orm(cls, geofence: Geofence):
+        return cls(
+            id=geofence.id,
+            fence_code=geofence.fence_code,
+            name=geofence.name,
+            latitude=geofence.latitude,
+            longitude=geofence.longitude,
+            radius=geofence.radius,
+            start_time=geofence.start_time,
+            end_time=geofence.end_time,
+            status=geofence.status,
+            creator_matric=geofence.creator_matric,
+        )
+
+
+class GeofenceCache:
+    """LRU cache of active geofences keyed by fence_code.
+
+    Entries expire after `ttl` seconds, which bounds how stale another worker's
+    copy can be; routes that change a fence call `invalidate` for this worker.
+    """
+
+    def __init__(self, ttl: float = 30, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple[float, ActiveGeofence]]" = OrderedDict()
+        # create/deactivate run in the threadpool, check-ins on the event loop
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, fence_code: str) -> Optional[ActiveGeofence]:
+        with self._lock:
+            entry = self._entries.get(fence_code)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, geofence = entry
+            if expires_at <= time.monotonic():
+                del self._entries[fence_code]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fence_code)
+            self.hits += 1
+            return geofence
+
+    def put(self, geofence: Geofence) -> ActiveGeofence:
+        snapshot = ActiveGeofence.from_orm(geofence)
+        with self._lock:
+            self._entries[snapshot.fence_code] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(snapshot.fence_code)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return snapshot
+
+    def invalidate(self, fence_code: str):
+        with self._lock:
+            self._entries.pop(fence_code, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+active_geofences = GeofenceCache(
+    ttl=settings.geofence_cache_ttl,
+    maxsize=settings.geofence_cache_maxsize,
+)
@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select, update
+
+from app.database.session import async_engine
+from app.models.geofence import Geofence
+from app.services.geofenceCache import active_geofences
+from app.services.geofenceVersion import geofence_version
+from app.settings import settings
+
+# (event, status the fence must currently have, status to move it to)
+TRANSITIONS = {
+    "start": (("scheduled",), "active"),
+    "end": (("scheduled", "active"), "inactive"),
+}
+
+
+def utc_naive(moment: datetime):
+    """Geofence times are stored as naive UTC; normalise aware values to match."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+    return moment
+
+
+def utc_now():
+    return datetime.now(ZoneInfo("UTC")).replace(tzinfo=None)
+
+
+class GeofenceScheduler:
+    """Flips geofence status at start_time (scheduled -> active) and end_time
+    (-> inactive) from a min-heap of upcoming events.
+
+    Every worker runs its own scheduler. Transitions are compare-and-set
+    UPDATEs (`WHERE status IN (...)`), so when several workers fire the same
+    event only the first one changes the row; each still invalidates its own
+    cache. The heap is rebuilt from the database on start and re-synced every
+    `resync_interval` seconds to pick up fences created on other workers.
+    """
+
+    def __init__(self, resync_interval: float = 60):
+        self.resync_interval = resync_interval
+        self.transitions = 0
+        self.listeners = []
+        self._heap = []
+        self._queued = set()
+        self._counter = itertools.count()
+        # create_geofence runs in the threadpool and schedules from there
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+        self._last_sync = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            await self.sync()
+        except Exception as e:
+            logging.error(f"Geofence scheduler could not load fences: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def schedule(self, fence_id, fence_code, start_time, end_time, status):
+        """Queues the remaining transitions of one fence."""
+        events = []
+        if status == "scheduled":
+            events.append((utc_naive(start_time), "start"))
+        if status in ("scheduled", "active"):
+            events.append((utc_naive(end_time), "end"))
+
+        with self._lock:
+            for when, event in events:
+                if (fence_id, event) in self._queued:
+                    continue
+                self._queued.add((fence_id, event))
+                heapq.heappush(
+                    self._heap, (when, next(self._counter), fence_id, fence_code, event)
+                )
+        if self._loop is not None and events:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def add_listener(self, listener):
+        """Registers listener(fence_code, status), called for each due event on
+        every worker, whether or not this worker's UPDATE won."""
+        self.listeners.append(listener)
+
+    async def sync(self):
+        """Loads every fence that still has a transition ahead of it."""
+        async with async_engine.connect() as conn:
+            result = await conn.execute(
+                select(
+                    Geofence.id,
+                    Geofence.fence_code,
+                    Geofence.start_time,
+                    Geofence.end_time,
+                    Geofence.status,
+                ).filter(Geofence.status.in_(("scheduled", "active")))
+            )
+            rows = result.all()
+        for row in rows:
+            self.schedule(
+                row.id, row.fence_code, row.start_time, row.end_time, row.status
+            )
+        self._last_sync = self._loop.time()
+
+    async def _run(self):
+        while True:
+            await self._fire_due_events()
+
+            with self._lock:
+                next_at = self._heap[0][0] if self._heap else None
+            delay = self.resync_interval
+            if next_at is not None:
+                delay = min(delay, max((next_at - utc_now()).total_seconds(), 0))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+            if self._loop.time() - self._last_sync >= self.resync_interval:
+                try:
+                    await self.sync()
+                except Exception as e:
+                    logging.error(f"Geofence scheduler resync failed: {e}")
+                    self._last_sync = self._loop.time()
+
+    async def _fire_due_events(self):
+        now = utc_now()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, fence_id, fence_code, event = heapq.heappop(self._heap)
+                self._queued.discard((fence_id, event))
+                due.append((fence_id, fence_code, event))
+
+        for fence_id, fence_code, event in due:
+            from_statuses, to_status = TRANSITIONS[event]
+            try:
+                async with async_engine.begin() as conn:
+                    result = await conn.execute(
+                        update(Geofence)
+                        .where(Geofence.id == fence_id, Geofence.status.in_(from_statuses))
+                        .values(status=to_status)
+                    )
+                    if result.rowcount:
+                        await geofence_version.bump_async(conn)
+            except Exception as e:
+                logging.error(f"Geofence {fence_code} {event} transition failed: {e}")
+                continue
+            if result.rowcount:
+                self.transitions += 1
+            # Invalidate even if another worker won the update
+            active_geofences.invalidate(fence_code)
+            for listener in self.listeners:
+                listener(fence_code, to_status)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self.running,
+                "queued_events": len(self._heap),
+                "next_event": self._heap[0][0].isoformat() if self._heap else None,
+                "transitions": self.transitions,
+            }
+
+
+geofence_scheduler = GeofenceScheduler(
+    resync_interval=settings.geofence_scheduler_resync
+)
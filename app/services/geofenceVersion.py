@@ -0,0 +1,51 @@
+import hashlib
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+
+from app.models.geofenceSetVersion import GeofenceSetVersion
+
+ROW_ID = 1
+
+
+class GeofenceVersion:
+    """Version of the geofence set, kept in the GeofenceSetVersion row.
+
+    Every create, deactivation and lifecycle transition bumps it in the same
+    transaction as the change, so a listing reads the version and the fences
+    from one consistent database (or replica) and every worker mints the same
+    ETag for the same state. Checking a tag costs one primary-key read instead
+    of the listing query.
+    """
+
+    def __init__(self):
+        table = GeofenceSetVersion.__table__
+        self._read = select(table.c.version).where(table.c.id == ROW_ID)
+        self._bump = (
+            update(table).where(table.c.id == ROW_ID).values(version=table.c.version + 1)
+        )
+        # Only needed if the migration that seeds the row hasn't run
+        self._seed = insert(table).values(id=ROW_ID, version=1)
+
+    def bump(self, db):
+        """Bumps the version inside `db`'s transaction (sync Session)."""
+        if not db.execute(self._bump).rowcount:
+            db.execute(self._seed)
+
+    async def bump_async(self, conn):
+        """Bumps the version inside `conn`'s transaction (AsyncSession or AsyncConnection)."""
+        if not (await conn.execute(self._bump)).rowcount:
+            await conn.execute(self._seed)
+
+    async def current(self, db) -> Optional[int]:
+        """The version as `db` sees it, or None if the row doesn't exist yet."""
+        return await db.scalar(self._read)
+
+    def etag(self, version: int, *parts):
+        """Weak ETag for a response built from `version` plus whatever else it
+        varies on, e.g. the caller and query parameters."""
+        raw = ":".join(str(part) for part in (version, *parts))
+        return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+geofence_version = GeofenceVersion()
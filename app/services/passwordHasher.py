@@ -0,0 +1,81 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.settings import settings
+
+BCRYPT_ROUNDS = settings.bcrypt_rounds
+
+# Hashes made with a different cost factor are flagged by verify_and_update,
+# which is what drives rehash-on-login when BCRYPT_ROUNDS changes.
+bcrypt_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS
+)
+
+
+# Module-level so they can be pickled into a process pool
+def _hash(password: str):
+    return bcrypt_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str):
+    return bcrypt_context.verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded worker pool so it never blocks the event loop.
+
+    At most `workers + max_queue` calls may be running or waiting at once;
+    anything beyond that is refused with a 503 instead of queueing forever.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 64, use_processes=False):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            pool = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self._executor = pool(max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str):
+        return await self._run(_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """Returns (valid, new_hash); new_hash is set when the stored cost is stale."""
+        return await self._run(_verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+    use_processes=settings.password_hash_executor == "process",
+)
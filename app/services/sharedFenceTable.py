@@ -0,0 +1,414 @@
+import asyncio
+import logging
+import mmap
+import os
+import platform
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from app.database.session import async_engine
+from app.models.geofence import Geofence
+from app.services.geofenceCache import ActiveGeofence
+from app.services.geofenceScheduler import utc_naive
+from app.settings import db_fingerprint, settings
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX: every worker keeps its own caches
+    fcntl = None
+
+MAGIC = 0x46454E43455442  # "FENCETB"
+EPOCH = datetime(1970, 1, 1)
+# Reads give up (and fall back to the DB) if a write stays in progress this long
+MAX_READ_RETRIES = 1000
+# Where stores become visible to other cores in program order (see the seqlock)
+SUPPORTED_MACHINES = {"x86_64", "amd64"}
+
+# One row per active fence. Strings are UTF-8 sized for the column lengths in
+# models/geofence.py at 4 bytes per character; times are naive-UTC microseconds.
+FENCE_DTYPE = np.dtype(
+    [
+        ("id", "<i8"),
+        ("latitude", "<f8"),
+        ("longitude", "<f8"),
+        ("radius", "<f8"),
+        ("start_time", "<i8"),
+        ("end_time", "<i8"),
+        ("status", "u1"),
+        ("fence_code", "S60"),
+        ("name", "S240"),
+        ("creator_matric", "S200"),
+    ]
+)
+
+# seq is the seqlock: odd while the owner is writing. dirty is bumped by any
+# worker after it changes a fence; applied is the dirty value the owner last
+# loaded. The table is only authoritative while the two are equal. database
+# identifies the database the rows came from.
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "<u8"),
+        ("layout", "<u8"),
+        ("seq", "<u8"),
+        ("count", "<u8"),
+        ("capacity", "<u8"),
+        ("dirty", "<u8"),
+        ("applied", "<u8"),
+        ("overflow", "<u8"),
+        ("owner_pid", "<u8"),
+        ("refreshed_at", "<f8"),
+        ("database", "<u8"),
+    ]
+)
+HEADER_SIZE = 128
+
+STATUS_CODES = {"scheduled": 0, "active": 1, "inactive": 2}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+
+def to_micros(moment: datetime):
+    return (utc_naive(moment) - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros: int):
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+class SharedFenceTable:
+    """Node-wide table of active geofences in a memory-mapped file.
+
+    One worker per node owns the table (whoever holds an flock on its lock
+    file) and rewrites it from the database whenever any worker reports a
+    change through `mark_dirty`, or every `resync_interval` seconds. Writes
+    are guarded by a seqlock, so every worker reads the mapped rows directly
+    and retries on a torn read. A worker only trusts the table while it is
+    authoritative: laid out as it expects, loaded from its own database, not
+    overflowing, and with no reported change still pending. Every worker
+    reports a change when it starts and a new owner does when it takes over,
+    so a table left by a previous run is only trusted once the current owner
+    has reloaded it. Otherwise `lookup` says so and the caller falls back to
+    its own cache and the database.
+
+    The seqlock relies on stores becoming visible in program order, which
+    holds on x86-64 only, so `start` leaves the table off anywhere else.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        database: str,
+        capacity: int = 4096,
+        poll_interval: float = 0.1,
+        resync_interval: float = 30,
+    ):
+        self.path = path
+        # Rows loaded from another database must never be trusted here
+        self.database = int(db_fingerprint(database), 16)
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+        self.resync_interval = resync_interval
+        self.size = HEADER_SIZE + capacity * FENCE_DTYPE.itemsize
+        self.layout = (capacity << 32) | FENCE_DTYPE.itemsize
+        self.is_owner = False
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.refreshes = 0
+        self._mmap = None
+        self._header = None
+        self._records = None
+        self._lock_fd = None
+        self._task = None
+        self._last_refresh = None
+        # This worker's view of the table at `_index_seq`
+        self._index_seq = None
+        self._index: dict[str, int] = {}
+        self._decoded: dict[str, ActiveGeofence] = {}
+        self._applied = None
+        self._usable = False
+
+    @property
+    def attached(self):
+        return self._header is not None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    # ---------------------------------------- mapping
+    def _map(self, create: bool):
+        flags = os.O_RDWR | (os.O_CREAT if create else 0)
+        try:
+            fd = os.open(self.path, flags, 0o600)
+        except FileNotFoundError:
+            return False
+        try:
+            if os.fstat(fd).st_size < self.size:
+                if not create:
+                    return False
+                # Only ever grown: shrinking would fault readers mapped at the old size
+                os.ftruncate(fd, self.size)
+            self._mmap = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        self._header = np.ndarray((), HEADER_DTYPE, buffer=self._mmap, offset=0)
+        self._records = np.ndarray(
+            (self.capacity,), FENCE_DTYPE, buffer=self._mmap, offset=HEADER_SIZE
+        )
+        return True
+
+    def _try_become_owner(self):
+        if fcntl is None:
+            return False
+        if self._lock_fd is None:
+            self._lock_fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        if not self.attached:
+            self._map(create=True)
+        # The rows predate this owner (a previous run's file, or a dead
+        # owner's): nobody trusts them until this owner's first refresh
+        self.mark_dirty()
+        self.is_owner = True
+        logging.info(f"Worker {os.getpid()} owns the shared fence table at {self.path}")
+        return True
+
+    def close(self):
+        self._header = None
+        self._records = None
+        self._index_seq = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # a row view is still alive; the mapping goes with the process
+            self._mmap = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # also releases ownership
+            self._lock_fd = None
+        self.is_owner = False
+
+    # ---------------------------------------- owner
+    def mark_dirty(self):
+        """Tells the owner a fence changed. Call after the change is committed."""
+        if self.attached:
+            self._header["dirty"] = int(self._header["dirty"]) + 1
+
+    def write(self, fences, applied: int):
+        rows = []
+        incomplete = False
+        for fence in fences:
+            try:
+                if None in (fence.latitude, fence.longitude, fence.radius):
+                    raise TypeError("fence without a position")
+                rows.append(
+                    (
+                        fence.id,
+                        fence.latitude,
+                        fence.longitude,
+                        fence.radius,
+                        to_micros(fence.start_time),
+                        to_micros(fence.end_time),
+                        STATUS_CODES.get(fence.status, STATUS_CODES["inactive"]),
+                        fence.fence_code.encode(),
+                        fence.name.encode(),
+                        fence.creator_matric.encode(),
+                    )
+                )
+            except (AttributeError, TypeError):
+                # A fence the table can't hold must not read as missing
+                incomplete = True
+        overflow = incomplete or len(rows) > self.capacity or any(
+            len(row[7]) > 60 or len(row[8]) > 240 or len(row[9]) > 200 for row in rows
+        )
+        rows = rows[: self.capacity]
+
+        header = self._header
+        seq = int(header["seq"])
+        # Odd while writing; a previous owner may have died mid-write already
+        header["seq"] = seq | 1
+        header["magic"] = MAGIC
+        header["layout"] = self.layout
+        header["capacity"] = self.capacity
+        header["database"] = self.database
+        if rows:
+            self._records[: len(rows)] = np.array(rows, dtype=FENCE_DTYPE)
+        header["count"] = len(rows)
+        header["overflow"] = int(overflow)
+        header["applied"] = applied
+        header["owner_pid"] = os.getpid()
+        header["refreshed_at"] = time.time()
+        header["seq"] = (seq | 1) + 1
+
+    async def refresh(self):
+        """Reloads the active fences from the database into the table."""
+        dirty = int(self._header["dirty"])
+        async with async_engine.connect() as conn:
+            fences = (
+                await conn.execute(
+                    select(
+                        Geofence.id,
+                        Geofence.fence_code,
+                        Geofence.name,
+                        Geofence.latitude,
+                        Geofence.longitude,
+                        Geofence.radius,
+                        Geofence.start_time,
+                        Geofence.end_time,
+                        Geofence.status,
+                        Geofence.creator_matric,
+                    ).filter(Geofence.status == "active")
+                )
+            ).all()
+        self.write(fences, dirty)
+        self.refreshes += 1
+        self._last_refresh = time.monotonic()
+
+    # ---------------------------------------- readers
+    def _reindex(self, seq: int):
+        header = self._header
+        self._usable = (
+            int(header["magic"]) == MAGIC
+            and int(header["layout"]) == self.layout
+            and int(header["database"]) == self.database
+            and not int(header["overflow"])
+        )
+        self._applied = int(header["applied"])
+        count = min(int(header["count"]), self.capacity) if self._usable else 0
+        codes = self._records["fence_code"][:count].tolist()
+        self._index = {code.decode(): row for row, code in enumerate(codes)}
+        self._decoded = {}
+        self._index_seq = seq
+
+    def _decode(self, row: int) -> ActiveGeofence:
+        record = self._records[row]
+        return ActiveGeofence(
+            id=int(record["id"]),
+            fence_code=record["fence_code"].decode(),
+            name=record["name"].decode(),
+            latitude=float(record["latitude"]),
+            longitude=float(record["longitude"]),
+            radius=float(record["radius"]),
+            start_time=from_micros(record["start_time"]),
+            end_time=from_micros(record["end_time"]),
+            status=STATUS_NAMES[int(record["status"])],
+            creator_matric=record["creator_matric"].decode(),
+        )
+
+    def lookup(self, fence_code: str) -> tuple[bool, Optional[ActiveGeofence]]:
+        """(authoritative, fence). When authoritative, a None fence means the
+        code is not an active fence anywhere on the node. When not, the caller
+        must look the fence up itself."""
+        header = self._header
+        if header is None:
+            return False, None
+        for _ in range(MAX_READ_RETRIES):
+            seq = int(header["seq"])
+            if seq & 1:
+                continue
+            if seq != self._index_seq:
+                self._reindex(seq)
+                if int(header["seq"]) != seq:
+                    continue
+            if not self._usable or int(header["dirty"]) != self._applied:
+                break
+            fence = self._decoded.get(fence_code)
+            if fence is None:
+                row = self._index.get(fence_code)
+                if row is not None:
+                    fence = self._decode(row)
+                    if int(header["seq"]) != seq:
+                        continue
+                    self._decoded[fence_code] = fence
+            if fence is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return True, fence
+        self.fallbacks += 1
+        return False, None
+
+    # ---------------------------------------- lifecycle
+    async def start(self):
+        machine = platform.machine()
+        if machine.lower() not in SUPPORTED_MACHINES:
+            logging.warning(f"Shared fence table disabled: its seqlock needs x86-64, not {machine}")
+            return
+        if not self._try_become_owner():
+            self._map(create=False)
+            self.mark_dirty()
+        if self.is_owner:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Shared fence table could not load fences: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            # Take over when the owner exits; its lock dies with it
+            if not self.is_owner:
+                self._try_become_owner()
+            if not self.attached:
+                self._map(create=False)
+                continue
+            if not self.is_owner:
+                continue
+            stale = time.monotonic() - (self._last_refresh or 0) >= self.resync_interval
+            if stale or int(self._header["dirty"]) != int(self._header["applied"]):
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logging.error(f"Shared fence table refresh failed: {e}")
+
+    def stats(self):
+        header = self._header
+        table = {}
+        if header is not None:
+            table = {
+                "count": int(header["count"]),
+                "capacity": int(header["capacity"]),
+                "seq": int(header["seq"]),
+                "dirty": int(header["dirty"]),
+                "applied": int(header["applied"]),
+                "overflow": bool(header["overflow"]),
+                "owner_pid": int(header["owner_pid"]),
+                "refreshed_at": float(header["refreshed_at"]),
+                "same_database": int(header["database"]) == self.database,
+            }
+        return {
+            "path": self.path,
+            "attached": self.attached,
+            "owner": self.is_owner,
+            "hits": self.hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+            "refreshes": self.refreshes,
+            **table,
+        }
+
+
+shared_fences = SharedFenceTable(
+    settings.shared_fence_table_path,
+    settings.db_url,
+    capacity=settings.shared_fence_table_capacity,
+    poll_interval=settings.shared_fence_table_poll_interval,
+    resync_interval=settings.shared_fence_table_resync,
+)
@@ -0,0 +1,114 @@
+import math
+import threading
+from collections import defaultdict
+
+from app.utils.haversine import EARTH_RADIUS_M, haversine
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+class GridIndex:
+    """Fixed lat/lng grid over fence centres.
+
+    Cells are `cell_size` metres of latitude on a side (by default the largest
+    fence radius), so a lookup only scans the few cells whose fences could
+    reach the point, however many fences exist elsewhere.
+    """
+
+    def __init__(self, fences=(), cell_size: float = None, min_cell_size: float = 50):
+        fences = list(fences)
+        self.max_radius = max((fence.radius for fence in fences), default=0)
+        self.cell_size = cell_size or max(self.max_radius, min_cell_size)
+        self.cell_degrees = self.cell_size / METERS_PER_DEGREE
+        self.cells = defaultdict(dict)
+        self.fences = {}
+        # deactivations edit the index from the threadpool while check-ins read it
+        self._lock = threading.RLock()
+        for fence in fences:
+            self.add(fence)
+
+    def __len__(self):
+        return len(self.fences)
+
+    def __contains__(self, fence_code):
+        return fence_code in self.fences
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def add(self, fence):
+        with self._lock:
+            self.remove(fence.fence_code)
+            cell = self._cell(fence.latitude, fence.longitude)
+            self.cells[cell][fence.fence_code] = fence
+            self.fences[fence.fence_code] = (cell, fence)
+            self.max_radius = max(self.max_radius, fence.radius)
+
+    def remove(self, fence_code):
+        with self._lock:
+            entry = self.fences.pop(fence_code, None)
+            if entry is None:
+                return
+            cell, _ = entry
+            bucket = self.cells[cell]
+            bucket.pop(fence_code, None)
+            if not bucket:
+                del self.cells[cell]
+
+    def _column_spans(self, lng, lng_reach):
+        """Column ranges covering `lng_reach` degrees either side of `lng`,
+        wrapped at the antimeridian; None when that is the whole band."""
+        if lng_reach >= 180:
+            return None
+        low, high = lng - lng_reach, lng + lng_reach
+        spans = [(max(low, -180), min(high, 180))]
+        if low < -180:
+            spans.append((low + 360, 180))
+        if high > 180:
+            spans.append((-180, high - 360))
+        return [
+            (math.floor(low / self.cell_degrees), math.floor(high / self.cell_degrees))
+            for low, high in spans
+        ]
+
+    def candidates(self, lat, lng, distance: float = 0):
+        """Fences in the cells that a fence within `distance` metres could occupy."""
+        reach = distance + self.max_radius
+        lat_cells = math.ceil(reach / self.cell_size)
+        # A degree of longitude shrinks with latitude; size the window for the
+        # most poleward row it covers. A window reaching a pole spans every
+        # longitude.
+        widest_lat = abs(lat) + reach / METERS_PER_DEGREE
+        lng_reach = 180
+        if widest_lat < 90:
+            lng_reach = reach / (METERS_PER_DEGREE * math.cos(math.radians(widest_lat)))
+        row, _ = self._cell(lat, lng)
+        rows = range(row - lat_cells, row + lat_cells + 1)
+        spans = self._column_spans(lng, lng_reach)
+        # Near the poles or for wide windows, the window holds more cells than
+        # are occupied, so filter the occupied ones instead of walking it
+        window = len(rows) * (
+            sum(high - low + 1 for low, high in spans) if spans else 360 / self.cell_degrees
+        )
+        if window > len(self.cells):
+            for (i, j), bucket in list(self.cells.items()):
+                if i in rows and (spans is None or any(low <= j <= high for low, high in spans)):
+                    yield from bucket.values()
+            return
+        for i in rows:
+            for low, high in spans:
+                for j in range(low, high + 1):
+                    bucket = self.cells.get((i, j))
+                    if bucket:
+                        yield from bucket.values()
+
+    def near(self, lat, lng, distance: float = 0):
+        """Fences whose circle comes within `distance` metres of the point;
+        distance=0 gives the fences that contain it."""
+        with self._lock:
+            return [
+                fence
+                for fence in self.candidates(lat, lng, distance)
+                if haversine(lat, lng, fence.latitude, fence.longitude)
+                <= fence.radius + distance
+            ]
@@ -0,0 +1,89 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.settings import settings
+
+
+class TokenCache:
+    """LRU cache of verified JWT claims keyed by a SHA-256 digest of the token.
+
+    An entry lives until the token's own `exp`, so a cached token is never
+    accepted after it would have failed verification. `invalidate_user` drops
+    every cached token for a matric at once; revocation itself is enforced
+    by TokenRevocations, which decode_token checks on cache hits too.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+        self._by_user: dict[str, set[bytes]] = {}
+        # get_current_user is a sync dependency, so lookups come from the threadpool
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        if not self.maxsize:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, token: str, claims: dict, expires_at: float):
+        if not self.maxsize:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(claims))
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(claims["user_matric"], set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_matric: str):
+        with self._lock:
+            for key in self._by_user.pop(user_matric, set()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _remove(self, key: bytes):
+        _, claims = self._entries.pop(key)
+        keys = self._by_user.get(claims["user_matric"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[claims["user_matric"]]
+
+
+token_cache = TokenCache(maxsize=settings.token_cache_size)
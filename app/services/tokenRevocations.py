@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+
+from app.database.session import async_engine
+from app.models.tokenRevocation import TokenRevocation
+from app.services.geofenceScheduler import utc_now
+from app.services.tokenCache import token_cache
+from app.settings import settings
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_timestamp(moment: datetime) -> float:
+    return (moment - EPOCH).total_seconds()
+
+
+class TokenRevocations:
+    """Per-user cutoffs checked by decode_token on every request, cached
+    token or not: a token issued at or before its user's cutoff is rejected.
+    Both are compared to the microsecond, so logging straight back in after
+    a revocation yields a token issued after it.
+
+    Cutoffs are stored in TokenRevocations, so every worker applies them: the
+    revoking worker at once, the others at their next sync, at most
+    `sync_interval` seconds later. A cutoff is forgotten once every token it
+    covers has expired (`token_lifetime` seconds).
+    """
+
+    def __init__(self, token_lifetime: float, sync_interval: float = 5):
+        self.token_lifetime = token_lifetime
+        self.sync_interval = sync_interval
+        self.rejected = 0
+        self._cutoffs: dict[str, float] = {}
+        # decode_token runs in the threadpool, syncs on the event loop
+        self._lock = threading.Lock()
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def is_revoked(self, user_matric: str, issued_at: Optional[float]) -> bool:
+        cutoff = self._cutoffs.get(user_matric)
+        if cutoff is None:
+            return False
+        # Tokens minted before `iat` was added can't prove they are newer
+        return issued_at is None or issued_at <= cutoff
+
+    def _apply(self, cutoffs: dict[str, float]):
+        """Merges loaded cutoffs with the local ones, keeping the later of
+        each and dropping those no unexpired token can predate."""
+        horizon = to_timestamp(utc_now()) - self.token_lifetime
+        with self._lock:
+            merged = dict(self._cutoffs)
+            for user_matric, cutoff in cutoffs.items():
+                merged[user_matric] = max(cutoff, merged.get(user_matric, cutoff))
+            self._cutoffs = {
+                user_matric: cutoff for user_matric, cutoff in merged.items() if cutoff > horizon
+            }
+
+    async def revoke(self, db, user_matric: str):
+        """Revokes every token issued to the user so far (AsyncSession)."""
+        revoked_at = utc_now()
+        result = await db.execute(
+            update(TokenRevocation)
+            .where(TokenRevocation.user_matric == user_matric)
+            .values(revoked_at=revoked_at)
+        )
+        if not result.rowcount:
+            await db.execute(
+                insert(TokenRevocation).values(user_matric=user_matric, revoked_at=revoked_at)
+            )
+        await db.commit()
+        self._apply({user_matric: to_timestamp(revoked_at)})
+        token_cache.invalidate_user(user_matric)
+
+    async def sync(self):
+        since = utc_now() - timedelta(seconds=self.token_lifetime)
+        async with async_engine.connect() as conn:
+            rows = (
+                await conn.execute(
+                    select(TokenRevocation.user_matric, TokenRevocation.revoked_at).filter(
+                        TokenRevocation.revoked_at > since
+                    )
+                )
+            ).all()
+        self._apply({row.user_matric: to_timestamp(row.revoked_at) for row in rows})
+
+    async def start(self):
+        try:
+            await self.sync()
+        except Exception as e:
+            logging.error(f"Token revocations could not be loaded: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logging.error(f"Token revocation sync failed: {e}")
+
+    def stats(self):
+        return {
+            "revoked_users": len(self._cutoffs),
+            "rejected": self.rejected,
+            "sync_interval": self.sync_interval,
+        }
+
+
+token_revocations = TokenRevocations(
+    token_lifetime=settings.access_token_minutes * 60,
+    sync_interval=settings.token_revocation_sync,
+)
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+
+def _flag(name: str, default: str = "false"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def db_fingerprint(db_url: Optional[str]) -> str:
+    """Short stable id of a database url, for naming state shared per database."""
+    return hashlib.sha256((db_url or "").encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Every environment variable the app reads, parsed once per process."""
+
+    environment: Optional[str]
+    db_url: Optional[str]
+    async_db_url: Optional[str]
+    async_db_pool_size: int
+    async_db_max_overflow: int
+    db_replica_urls: tuple[str, ...]
+    replica_health_check_interval: float
+    read_your_writes_seconds: float
+    secret_key: Optional[str]
+    algorithm: Optional[str]
+    bcrypt_rounds: int
+    password_hash_workers: int
+    password_hash_max_queue: int
+    password_hash_executor: str
+    token_cache_size: int
+    access_token_minutes: float
+    token_revocation_sync: float
+    geofence_cache_ttl: float
+    geofence_cache_maxsize: int
+    geofence_scheduler_resync: float
+    checkin_registry_max_fences: int
+    attendance_write_behind: bool
+    attendance_queue_size: int
+    attendance_batch_size: int
+    attendance_flush_interval: float
+    attendance_enqueue_timeout: float
+    attendance_flush_retries: int
+    attendance_flush_retry_delay: float
+    attendance_feed_queue_size: int
+    attendance_feed_max_subscribers: int
+    query_profiler: bool
+    slow_query_ms: float
+    admission_control: bool
+    admission_max_concurrent: int
+    admission_check_in_concurrency: int
+    admission_login_concurrency: int
+    admission_export_concurrency: int
+    admission_queue_size: int
+    admission_queue_timeout: float
+    admission_user_rate: float
+    admission_user_burst: int
+    shared_fence_table: bool
+    shared_fence_table_path: str
+    shared_fence_table_capacity: int
+    shared_fence_table_poll_interval: float
+    shared_fence_table_resync: float
+
+    @classmethod
+    def from_env(cls):
+        async_db_pool_size = int(os.getenv("ASYNC_DB_POOL_SIZE", 10))
+        async_db_max_overflow = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 20))
+        password_hash_workers = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+        db_url = os.getenv("DB_URL_STRING")
+        return cls(
+            environment=os.getenv("ENVIRONMENT"),
+            db_url=db_url,
+            async_db_url=os.getenv("ASYNC_DB_URL_STRING"),
+            async_db_pool_size=async_db_pool_size,
+            async_db_max_overflow=async_db_max_overflow,
+            # Comma-separated sync urls of read replicas, e.g. two SQLite files locally
+            db_replica_urls=tuple(
+                url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()
+            ),
+            replica_health_check_interval=float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", 5)),
+            read_your_writes_seconds=float(os.getenv("READ_YOUR_WRITES_SECONDS", 5)),
+            secret_key=os.getenv("SECRET_KEY"),
+            algorithm=os.getenv("ALGORITHM"),
+            bcrypt_rounds=int(os.getenv("BCRYPT_ROUNDS", 12)),
+            password_hash_workers=password_hash_workers,
+            password_hash_max_queue=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 64)),
+            password_hash_executor=os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower(),
+            token_cache_size=int(os.getenv("TOKEN_CACHE_SIZE", 10000)),
+            access_token_minutes=float(os.getenv("ACCESS_TOKEN_MINUTES", 20)),
+            token_revocation_sync=float(os.getenv("TOKEN_REVOCATION_SYNC", 5)),
+            geofence_cache_ttl=float(os.getenv("GEOFENCE_CACHE_TTL", 30)),
+            geofence_cache_maxsize=int(os.getenv("GEOFENCE_CACHE_MAXSIZE", 1024)),
+            geofence_scheduler_resync=float(os.getenv("GEOFENCE_SCHEDULER_RESYNC", 60)),
+            checkin_registry_max_fences=int(os.getenv("CHECKIN_REGISTRY_MAX_FENCES", 256)),
+            attendance_write_behind=_flag("ATTENDANCE_WRITE_BEHIND"),
+            attendance_queue_size=int(os.getenv("ATTENDANCE_QUEUE_SIZE", 5000)),
+            attendance_batch_size=int(os.getenv("ATTENDANCE_BATCH_SIZE", 200)),
+            attendance_flush_interval=float(os.getenv("ATTENDANCE_FLUSH_INTERVAL", 0.05)),
+            attendance_enqueue_timeout=float(os.getenv("ATTENDANCE_ENQUEUE_TIMEOUT", 0.5)),
+            attendance_flush_retries=int(os.getenv("ATTENDANCE_FLUSH_RETRIES", 3)),
+            attendance_flush_retry_delay=float(os.getenv("ATTENDANCE_FLUSH_RETRY_DELAY", 0.5)),
+            attendance_feed_queue_size=int(os.getenv("ATTENDANCE_FEED_QUEUE_SIZE", 256)),
+            attendance_feed_max_subscribers=int(
+                os.getenv("ATTENDANCE_FEED_MAX_SUBSCRIBERS", 1000)
+            ),
+            # Both add work to every request, so deployments opt in
+            query_profiler=_flag("QUERY_PROFILER"),
+            slow_query_ms=float(os.getenv("SLOW_QUERY_MS", 200)),
+            admission_control=_flag("ADMISSION_CONTROL"),
+            # 0 disables a limit
+            admission_max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", 256)),
+            # By default no more check-ins run than the async pool can serve at once
+            admission_check_in_concurrency=int(
+                os.getenv("ADMISSION_CHECK_IN_CONCURRENCY", async_db_pool_size + async_db_max_overflow)
+            ),
+            admission_login_concurrency=int(
+                os.getenv("ADMISSION_LOGIN_CONCURRENCY", password_hash_workers * 2)
+            ),
+            # Each export holds a pooled connection until its last row is sent
+            admission_export_concurrency=int(
+                os.getenv("ADMISSION_EXPORT_CONCURRENCY", max(1, async_db_pool_size // 2))
+            ),
+            admission_queue_size=int(os.getenv("ADMISSION_QUEUE_SIZE", 100)),
+            admission_queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 0.5)),
+            admission_user_rate=float(os.getenv("ADMISSION_USER_RATE", 1)),
+            admission_user_burst=int(os.getenv("ADMISSION_USER_BURST", 5)),
+            shared_fence_table=_flag("SHARED_FENCE_TABLE"),
+            # Workers of one deployment on a node must agree on this path; the
+            # default is per database, so deployments sharing a host stay apart
+            shared_fence_table_path=os.getenv(
+                "SHARED_FENCE_TABLE_PATH",
+                os.path.join(
+                    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                    f"fast_api_backend_fences_{db_fingerprint(db_url)}",
+                ),
+            ),
+            shared_fence_table_capacity=int(os.getenv("SHARED_FENCE_TABLE_CAPACITY", 4096)),
+            shared_fence_table_poll_interval=float(
+                os.getenv("SHARED_FENCE_TABLE_POLL_INTERVAL", 0.1)
+            ),
+            shared_fence_table_resync=float(os.getenv("SHARED_FENCE_TABLE_RESYNC", 30)),
+        )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    # .env is only read in development, so python-dotenv stays off the import path elsewhere
+    if os.getenv("ENVIRONMENT") == "development":
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    return Settings.from_env()
+
+
+settings = get_settings()
@@ -1,3 +1,9 @@
 from .authenticateUser import authenticate_user
 from .createAccessToken import create_access_token
-from .decodeAccessToken import decode_token
\ No newline at end of file
+from .decodeAccessToken import TokenRevoked, decode_token
+from .dayRange import day_range
+from .pageCursor import encode_cursor, decode_cursor, keyset_page, finish_page
+from .haversine import haversine
+from .conditionalGet import etag_matches
+from .contentDisposition import attachment
+from .isDuplicateEntry import is_duplicate_entry
@@ -1,15 +1,16 @@
-from passlib.context import CryptContext
 from app.models import User
-from sqlalchemy import or_
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.passwordHasher import password_hasher
 
-def authenticate_user(user_pass, password: str, db):
-    user = (
-        db.query(User)
-        .filter(or_(User.email == user_pass, User.user_matric == user_pass))
-        .first()
-    )
 
-    if not bcrypt_context.verify(password, user.hashed_password):
+async def authenticate_user(user: User, password: str, db):
+    """Checks the password of an already loaded user; db is the AsyncSession it came from."""
+    valid, new_hash = await password_hasher.verify_and_update(
+        password, user.hashed_password
+    )
+    if not valid:
         return False
+    # Stored hash uses an outdated cost factor; upgrade it while we have the password
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
@@ -0,0 +1,11 @@
+import re
+from urllib.parse import quote
+
+UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def attachment(filename: str):
+    """Content-Disposition for a download named after user input: a plain
+    ASCII fallback for old clients, and the exact name RFC 5987 encoded."""
+    fallback = UNSAFE.sub("_", filename).strip("._") or "download"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
@@ -2,13 +2,8 @@ from pydantic import EmailStr
 from datetime import timedelta, datetime
 from jose import JWTError, jwt
 
-import os
-from dotenv import load_dotenv
-if os.getenv("ENVIRONMENT") == "development":
-    load_dotenv()
-
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM") 
+from app.services.tokenRevocations import to_timestamp
+from app.settings import settings
 
 def create_access_token(
     email: EmailStr,
@@ -23,6 +18,9 @@ def create_access_token(
         "role": role,
         "user_matric": user_matric,
     }
-    expires = datetime.utcnow() + expires_delta
-    data_to_encode.update({"exp": expires})
-    return jwt.encode(data_to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    issued = datetime.utcnow()
+    # iat lets a revocation tell tokens issued before it from later ones. It
+    # keeps its microseconds (NumericDate may be fractional), as jose would
+    # truncate a datetime to the second.
+    data_to_encode.update({"iat": to_timestamp(issued), "exp": issued + expires_delta})
+    return jwt.encode(data_to_encode, settings.secret_key, algorithm=settings.algorithm)
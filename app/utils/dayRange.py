@@ -0,0 +1,13 @@
+from datetime import date, datetime, time, timedelta
+
+
+def day_range(day: date | datetime):
+    """Half-open [midnight, next midnight) bounds for the given day.
+
+    Filtering with `col >= start, col < end` instead of `func.date(col) == day`
+    lets the database use an index on the timestamp column.
+    """
+    if isinstance(day, datetime):
+        day = day.date()
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
@@ -1,17 +1,32 @@
 from jose import jwt, JWTError
-import os
-from dotenv import load_dotenv
 from fastapi import HTTPException, status
+from app.services.tokenCache import token_cache
+from app.services.tokenRevocations import token_revocations
+from app.settings import settings
 
-if os.getenv("ENVIRONMENT") == "development":
-    load_dotenv()
 
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
+class TokenRevoked(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked.",
+        )
+
 
 def decode_token(token: str):
+    # Tokens already verified are served from the cache until they expire,
+    # but revocation is checked on every use
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = verify_token(token)
+    if token_revocations.is_revoked(claims["user_matric"], claims["issued_at"]):
+        raise TokenRevoked()
+    return claims
+
+
+def verify_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         email = payload.get("sub")
         username = payload.get("username")
         role = payload.get("role")
@@ -23,12 +38,16 @@ def decode_token(token: str):
                 detail="Could not validate user",
             )
 
-        return {
+        claims = {
             "email": email,
             "username": username,
             "role": role,
             "user_matric": user_matric,
+            "issued_at": payload.get("iat"),
         }
+        if payload.get("exp"):
+            token_cache.put(token, claims, payload["exp"])
+        return claims
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
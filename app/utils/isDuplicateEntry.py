@@ -0,0 +1,8 @@
+from sqlalchemy.exc import IntegrityError
+
+
+def is_duplicate_entry(e: IntegrityError):
+    """True if the IntegrityError was raised by a unique key violation."""
+    orig = e.orig
+    code = getattr(orig, "errno", None) or (orig.args[0] if orig.args else None)
+    return code == 1062 or "UNIQUE constraint failed" in str(orig)
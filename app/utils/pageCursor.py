@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(timestamp: datetime, id: int):
+    """Opaque cursor for the (timestamp, id) position of the last row on a page."""
+    raw = json.dumps([timestamp.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        timestamp, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid page cursor"
+        )
+
+
+def keyset_page(statement, timestamp_column, id_column, limit: int, after=None):
+    """Newest-first keyset page of `statement`.
+
+    Fetches one row more than `limit` so the caller can tell whether there is
+    a next page without a COUNT.
+    """
+    if after is not None:
+        timestamp, id = decode_cursor(after)
+        statement = statement.filter(
+            or_(
+                timestamp_column < timestamp,
+                and_(timestamp_column == timestamp, id_column < id),
+            )
+        )
+    return statement.order_by(timestamp_column.desc(), id_column.desc()).limit(
+        limit + 1
+    )
+
+
+def finish_page(rows, limit: int, response, timestamp_attr: str):
+    """Drops the look-ahead row and advertises the next page in X-Next-Cursor."""
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            getattr(last, timestamp_attr), last.id
+        )
+    return rows
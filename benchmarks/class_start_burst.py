@@ -0,0 +1,319 @@
+"""Load test of a class-start burst: students logging in and checking in at once.
+
+Seeds users and an active fence into a throwaway SQLite file, mints tokens, and
+drives each scenario with httpx + asyncio against the app in-process (lifespan
+included, so the scheduler and write-behind queue run as in production):
+
+    python -m benchmarks.class_start_burst --students 300 --concurrency 100 \\
+        --output results.json
+
+Point DB_URL_STRING at a local MySQL to seed and hit that instead, or pass
+--base-url to drive a server already running against the same database.
+Results are written as JSON; --compare old.json prints the change per scenario
+so two commits can be compared run against run.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DB_URL_STRING", f"sqlite:///{_tmp}/burst.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+# Shedding is what this measures; ADMISSION_CONTROL=false shows the burst without it
+os.environ.setdefault("ADMISSION_CONTROL", "true")
+
+import httpx
+from sqlalchemy import delete, text
+
+from app.database.session import Base, SessionLocal, async_engine, engine
+from app.main import app
+from app.models import AttendanceRecord, Geofence, User
+from app.services import check_in_registry
+from app.services.passwordHasher import bcrypt_context
+from app.utils import create_access_token
+
+FENCE_CODE = "BURST1"
+LAT, LNG = 6.5244, 3.3792
+PASSWORD = "class-start-burst"
+SHED_STATUSES = {429, 503}
+
+
+def seed(students):
+    Base.metadata.create_all(bind=engine)
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.execute(text("PRAGMA journal_mode=WAL"))
+    now = datetime.now(ZoneInfo("UTC"))
+    # One hash for everyone: seeding shouldn't take longer than the test
+    hashed_password = bcrypt_context.hash(PASSWORD)
+    with SessionLocal() as db:
+        db.add(User(user_matric="BURSTADMIN", email="admin@burst.local", role="admin"))
+        db.add_all(
+            User(
+                user_matric=f"BURST{i:05d}",
+                email=f"s{i}@burst.local",
+                username=f"student{i}",
+                hashed_password=hashed_password,
+                role="student",
+            )
+            for i in range(students)
+        )
+        db.add(
+            Geofence(
+                fence_code=FENCE_CODE,
+                name="BURST101",
+                latitude=LAT,
+                longitude=LNG,
+                radius=100,
+                fence_type="circle",
+                start_time=now - timedelta(minutes=5),
+                end_time=now + timedelta(hours=1),
+                status="active",
+                time_created=now,
+                creator_matric="BURSTADMIN",
+            )
+        )
+        db.commit()
+
+
+def mint_tokens(students):
+    return [
+        create_access_token(
+            f"s{i}@burst.local",
+            f"student{i}",
+            "student",
+            f"BURST{i:05d}",
+            timedelta(minutes=20),
+        )
+        for i in range(students)
+    ]
+
+
+def clear_attendance():
+    with SessionLocal() as db:
+        db.execute(delete(AttendanceRecord))
+        db.commit()
+    check_in_registry.clear()
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(latencies):
+    return {
+        "p50": round(percentile(latencies, 50) * 1000, 2),
+        "p95": round(percentile(latencies, 95) * 1000, 2),
+        "p99": round(percentile(latencies, 99) * 1000, 2),
+        "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def summarise(name, concurrency, samples, elapsed):
+    latencies = sorted(latency for latency, _ in samples)
+    # Requests that got past admission control; shed ones answer in microseconds
+    admitted = sorted(latency for latency, status in samples if status not in SHED_STATUSES)
+    statuses = Counter(status for _, status in samples)
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    shed = sum(count for status, count in statuses.items() if status in SHED_STATUSES)
+    return {
+        "scenario": name,
+        "requests": len(samples),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "latency_ms": latency_summary(latencies),
+        "admitted_latency_ms": latency_summary(admitted),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "shed_rate": round(shed / len(samples), 4) if samples else 0.0,
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+async def timed(request):
+    """Latency and status of one call; transport failures count as status 599."""
+    start = time.perf_counter()
+    try:
+        response = await request()
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 599
+    return time.perf_counter() - start, status
+
+
+async def login(client, i):
+    return await timed(
+        lambda: client.post(
+            "/auth/token/", data={"username": f"BURST{i:05d}", "password": PASSWORD}
+        )
+    )
+
+
+async def check_in(client, token):
+    return await timed(
+        lambda: client.post(
+            "/record_attendance/",
+            params={"fence_code": FENCE_CODE, "lat": LAT, "long": LNG},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    )
+
+
+async def login_then_check_in(client, i):
+    """The real burst: one sample covers both calls a student makes."""
+    start = time.perf_counter()
+    try:
+        response = await client.post(
+            "/auth/token/", data={"username": f"BURST{i:05d}", "password": PASSWORD}
+        )
+    except httpx.HTTPError:
+        return time.perf_counter() - start, 599
+    if response.status_code != 200:
+        return time.perf_counter() - start, response.status_code
+    _, status = await check_in(client, response.json()["access_token"])
+    return time.perf_counter() - start, status
+
+
+async def run_scenario(client, name, calls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(call):
+        async with semaphore:
+            return await call()
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(limited(call) for call in calls))
+    return summarise(name, concurrency, samples, time.perf_counter() - start)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    before = {row["scenario"]: row for row in (baseline or {}).get("scenarios", [])}
+    print(
+        f"{'scenario':<22} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8} "
+        f"{'shed':>8} {'admitted p99':>13}"
+    )
+    for row in results["scenarios"]:
+        latency = row["latency_ms"]
+        print(
+            f"{row['scenario']:<22} {row['throughput_rps']:9.1f} {latency['p50']:9.2f} "
+            f"{latency['p95']:9.2f} {latency['p99']:9.2f} {row['error_rate']:8.2%} "
+            f"{row.get('shed_rate', 0):8.2%} {row.get('admitted_latency_ms', latency)['p99']:13.2f}"
+        )
+        old = before.get(row["scenario"])
+        if old:
+            change = lambda new, prev: f"{(new - prev) / prev:+.1%}" if prev else "n/a"
+            print(
+                f"{'  vs baseline':<22} {change(row['throughput_rps'], old['throughput_rps']):>9} "
+                f"{change(latency['p50'], old['latency_ms']['p50']):>9} "
+                f"{change(latency['p95'], old['latency_ms']['p95']):>9} "
+                f"{change(latency['p99'], old['latency_ms']['p99']):>9} "
+                f"{row['error_rate'] - old['error_rate']:+8.2%}"
+            )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--base-url", help="drive a running server instead of the app in-process")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to diff against")
+    args = parser.parse_args()
+
+    seed(args.students)
+    tokens = mint_tokens(args.students)
+    students = range(args.students)
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        lifespan = None
+    else:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://burst", timeout=60)
+        lifespan = app.router.lifespan_context(app)
+
+    scenarios = []
+    if lifespan is not None:
+        await lifespan.__aenter__()
+    try:
+        async with client:
+            scenarios.append(
+                await run_scenario(
+                    client, "login", [lambda i=i: login(client, i) for i in students], args.concurrency
+                )
+            )
+            clear_attendance()
+            scenarios.append(
+                await run_scenario(
+                    client,
+                    "check_in",
+                    [lambda t=t: check_in(client, t) for t in tokens],
+                    args.concurrency,
+                )
+            )
+            clear_attendance()
+            scenarios.append(
+                await run_scenario(
+                    client,
+                    "login_then_check_in",
+                    [lambda i=i: login_then_check_in(client, i) for i in students],
+                    args.concurrency,
+                )
+            )
+    finally:
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+        await async_engine.dispose()
+
+    results = {
+        "benchmark": "class_start_burst",
+        "commit": git_commit(),
+        "recorded_at": datetime.now(ZoneInfo("UTC")).isoformat(),
+        "database": engine.dialect.name,
+        "target": args.base_url or "in-process",
+        "python": platform.python_version(),
+        "students": args.students,
+        "scenarios": scenarios,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
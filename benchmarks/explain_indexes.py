@@ -0,0 +1,93 @@
+"""Checks that the day-filtered queries are served by the composite indexes.
+
+Builds the schema in an in-memory SQLite database, runs EXPLAIN QUERY PLAN on
+the route queries and exits non-zero if any of them isn't a SEARCH through the
+expected index:
+
+    python -m benchmarks.explain_indexes
+"""
+
+import os
+import sys
+from datetime import datetime
+
+os.environ.setdefault("DB_URL_STRING", "sqlite://")
+
+from sqlalchemy import create_engine, select
+
+from app.database.session import Base
+from app.models import AttendanceRecord, Geofence, User
+from app.utils import day_range, encode_cursor, keyset_page
+
+day_start, day_end = day_range(datetime(2024, 9, 16))
+cursor = encode_cursor(datetime(2024, 9, 16, 10, 30), 1234)
+
+QUERIES = {
+    "ix_geofences_name_start_time": select(Geofence).filter(
+        Geofence.name == "CSC101",
+        Geofence.start_time >= day_start,
+        Geofence.start_time < day_end,
+    ),
+    "ix_geofences_creator_matric_start_time": select(Geofence).filter(
+        Geofence.creator_matric == "ADMIN01",
+        Geofence.start_time >= day_start,
+        Geofence.start_time < day_end,
+    ),
+    "ix_attendance_geofence_name_timestamp": select(
+        User.username, AttendanceRecord.user_matric, AttendanceRecord.timestamp
+    )
+    .join(User, AttendanceRecord.user_matric == User.user_matric)
+    .filter(
+        AttendanceRecord.geofence_name == "CSC101",
+        AttendanceRecord.timestamp >= day_start,
+        AttendanceRecord.timestamp < day_end,
+    ),
+    "ix_attendance_user_matric_fence_code": select(AttendanceRecord.id).filter(
+        AttendanceRecord.user_matric == "STU001",
+        AttendanceRecord.fence_code == "Ab12Cd",
+    ),
+    "ix_geofences_time_created": keyset_page(
+        select(Geofence), Geofence.time_created, Geofence.id, 50, cursor
+    ),
+    "ix_geofences_creator_matric_time_created": keyset_page(
+        select(Geofence).filter(Geofence.creator_matric == "ADMIN01"),
+        Geofence.time_created,
+        Geofence.id,
+        50,
+        cursor,
+    ),
+    "ix_attendance_user_matric_timestamp": keyset_page(
+        select(AttendanceRecord).filter(AttendanceRecord.user_matric == "STU001"),
+        AttendanceRecord.timestamp,
+        AttendanceRecord.id,
+        50,
+        cursor,
+    ),
+}
+
+
+def query_plan(conn, statement):
+    compiled = statement.compile(conn, compile_kwargs={"literal_binds": True})
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return [row[-1] for row in rows]
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    failed = False
+    with engine.connect() as conn:
+        for index_name, statement in QUERIES.items():
+            plan = query_plan(conn, statement)
+            used = any(
+                detail.startswith("SEARCH") and index_name in detail for detail in plan
+            )
+            failed = failed or not used
+            print(f"{'ok  ' if used else 'FAIL'} {index_name}")
+            for detail in plan:
+                print(f"       {detail}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Which-fences-am-I-in: scalar haversine loop vs the vectorised FenceSet.
+
+    python -m benchmarks.fence_containment --fences 10000 --points 100
+"""
+
+import argparse
+import os
+import random
+import timeit
+
+os.environ.setdefault("DB_URL_STRING", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from app.main import check_user_in_circular_geofence
+from app.services import ActiveGeofence, FenceSet
+
+# Rough bounding box of a large campus area in Lagos
+LAT_RANGE = (6.40, 6.60)
+LNG_RANGE = (3.30, 3.50)
+
+
+def random_fences(count, rng):
+    return [
+        ActiveGeofence(
+            id=i,
+            fence_code=f"F{i:05d}",
+            name=f"COURSE{i}",
+            latitude=rng.uniform(*LAT_RANGE),
+            longitude=rng.uniform(*LNG_RANGE),
+            radius=rng.uniform(20, 500),
+            start_time=None,
+            end_time=None,
+            status="active",
+            creator_matric="BENCHADMIN",
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fences", type=int, default=10000)
+    parser.add_argument("--points", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    fences = random_fences(args.fences, rng)
+    points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(args.points)]
+    fence_set = FenceSet(fences)
+
+    def scalar():
+        return [
+            [f.fence_code for f in fences if check_user_in_circular_geofence(lat, lng, f)]
+            for lat, lng in points
+        ]
+
+    def vectorised():
+        return [[f.fence_code for f in fence_set.containing(lat, lng)] for lat, lng in points]
+
+    def vectorised_batch():
+        return fence_set.contains([p[0] for p in points], [p[1] for p in points])
+
+    assert scalar() == vectorised(), "vectorised containment disagrees with haversine()"
+
+    results = {
+        "scalar loop": timeit.timeit(scalar, number=3) / 3,
+        "FenceSet per point": timeit.timeit(vectorised, number=3) / 3,
+        "FenceSet batch": timeit.timeit(vectorised_batch, number=3) / 3,
+    }
+    print(f"{args.fences} fences, {args.points} points")
+    for label, seconds in results.items():
+        print(
+            f"{label:<20} {seconds * 1000 / args.points:8.3f} ms/point"
+            f"  ({results['scalar loop'] / seconds:6.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
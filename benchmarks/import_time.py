@@ -0,0 +1,91 @@
+"""Import-time budget for app.main: fails when a cold import gets slower.
+
+Imports the app in a fresh interpreter under `python -X importtime`, parses the
+per-module timings from stderr and reports the best of several runs:
+
+    python -m benchmarks.import_time --budget-ms 1500 --top 15
+
+Exits 1 if the total import time is over the budget (IMPORT_TIME_BUDGET_MS,
+1500 ms by default) or if a module that should only be imported lazily, such as
+a debug helper, shows up at import time. Run it in CI or before deploying to
+catch cold-start regressions.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# "import time:      self [us] | cumulative | imported package"
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+DEFAULT_FORBIDDEN = ["icecream", "mysql.connector", "dotenv"]
+
+
+def measure(module):
+    """One cold import of `module`. Returns (total seconds, {module: cumulative seconds})."""
+    env = dict(os.environ)
+    env.setdefault("DB_URL_STRING", "sqlite://")
+    env.setdefault("SECRET_KEY", "import-time")
+    env.setdefault("ALGORITHM", "HS256")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        modules[name] = int(cumulative) / 1e6
+        # Top-level imports have a single space of indentation
+        if len(indent) == 1:
+            total += int(cumulative)
+    return total / 1e6, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("IMPORT_TIME_BUDGET_MS", 1500)),
+    )
+    parser.add_argument(
+        "--forbid",
+        nargs="*",
+        default=DEFAULT_FORBIDDEN,
+        help="modules that must not be imported eagerly",
+    )
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    total, modules = min(measure(args.module) for _ in range(args.runs))
+
+    print(f"import {args.module}: {total * 1000:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print(f"{'cumulative ms':>14}  module")
+    for name, seconds in sorted(modules.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"{seconds * 1000:14.1f}  {name}")
+
+    failures = []
+    if total * 1000 > args.budget_ms:
+        failures.append(f"{total * 1000:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    for name in args.forbid:
+        if name in modules:
+            failures.append(f"{name} is imported eagerly ({modules[name] * 1000:.1f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Serialization cost of a geofence listing: ORM + jsonable_encoder vs columns + response model + orjson.
+
+Seeds an in-memory SQLite database and times both ways of turning a page of
+geofences into a response body, query included:
+
+    python -m benchmarks.serialization --rows 1000 10000
+
+"old" is the previous listing path: select(Geofence) loads ORM instances,
+FastAPI walks them with jsonable_encoder and JSONResponse calls json.dumps.
+"new" is the current one: select(*GEOFENCE_COLUMNS) returns plain rows,
+pydantic-core validates and dumps them through GeofenceList and
+ORJSONResponse encodes the result.
+"""
+
+import argparse
+import os
+import timeit
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DB_URL_STRING", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.database.session import Base
+from app.main import GEOFENCE_COLUMNS
+from app.models import Geofence
+from app.schemas import GeofenceList
+
+geofence_list = TypeAdapter(GeofenceList)
+
+
+def seed(engine, rows):
+    start = datetime(2024, 9, 2, 8)
+    with Session(engine) as db:
+        db.execute(delete(Geofence))
+        db.execute(
+            insert(Geofence),
+            [
+                dict(
+                    fence_code=f"F{i:07d}",
+                    name=f"CSC{i % 400:03d}",
+                    latitude=6.5 + i * 1e-5,
+                    longitude=3.3 + i * 1e-5,
+                    radius=100,
+                    fence_type="circle",
+                    start_time=start + timedelta(hours=i),
+                    end_time=start + timedelta(hours=i + 1),
+                    status="inactive",
+                    time_created=start + timedelta(hours=i, minutes=-10),
+                    creator_matric=f"ADM{i % 50:03d}",
+                )
+                for i in range(rows)
+            ],
+        )
+        db.commit()
+
+
+def old_path(engine):
+    with Session(engine) as db:
+        geofences = db.scalars(select(Geofence)).all()
+        return JSONResponse(jsonable_encoder({"geofences": geofences})).body
+
+
+def new_path(engine):
+    with Session(engine) as db:
+        geofences = db.execute(select(*GEOFENCE_COLUMNS)).all()
+        content = geofence_list.dump_python(
+            geofence_list.validate_python({"geofences": geofences}), mode="json"
+        )
+        return ORJSONResponse(content).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    for rows in args.rows:
+        seed(engine, rows)
+        assert len(old_path(engine)) > 0 and len(new_path(engine)) > 0
+        old = min(timeit.repeat(lambda: old_path(engine), number=1, repeat=args.repeat))
+        new = min(timeit.repeat(lambda: new_path(engine), number=1, repeat=args.repeat))
+        print(
+            f"{rows:>6} rows  old {old * 1000:8.1f} ms  new {new * 1000:8.1f} ms  "
+            f"speedup {old / new:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Nearby-fence lookup: linear haversine scan vs the GridIndex.
+
+Fences are spread at constant density over an area that grows with the fence
+count (like adding campuses), so a good index keeps query time flat:
+
+    python -m benchmarks.spatial_index --counts 1000 10000 100000
+"""
+
+import argparse
+import math
+import os
+import random
+import timeit
+
+os.environ.setdefault("DB_URL_STRING", "sqlite://")
+
+from app.services import ActiveGeofence, GridIndex
+from app.utils import haversine
+
+FENCES_PER_KM2 = 50
+QUERY_DISTANCE = 200
+
+
+def random_fences(count, rng):
+    # Square patch near Lagos sized for FENCES_PER_KM2
+    side_degrees = math.sqrt(count / FENCES_PER_KM2) / 111.19
+    return [
+        ActiveGeofence(
+            id=i,
+            fence_code=f"F{i:06d}",
+            name=f"COURSE{i}",
+            latitude=6.4 + rng.uniform(0, side_degrees),
+            longitude=3.3 + rng.uniform(0, side_degrees),
+            radius=rng.uniform(20, 150),
+            start_time=None,
+            end_time=None,
+            status="active",
+            creator_matric="BENCHADMIN",
+        )
+        for i in range(count)
+    ], side_degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'fences':>8} {'linear scan':>14} {'grid index':>14} {'build':>10}")
+    for count in args.counts:
+        fences, side = random_fences(count, rng)
+        points = [
+            (6.4 + rng.uniform(0, side), 3.3 + rng.uniform(0, side))
+            for _ in range(args.queries)
+        ]
+        start = timeit.default_timer()
+        index = GridIndex(fences)
+        build = timeit.default_timer() - start
+
+        def linear():
+            return [
+                sorted(
+                    f.fence_code
+                    for f in fences
+                    if haversine(lat, lng, f.latitude, f.longitude)
+                    <= f.radius + QUERY_DISTANCE
+                )
+                for lat, lng in points
+            ]
+
+        def grid():
+            return [
+                sorted(f.fence_code for f in index.near(lat, lng, QUERY_DISTANCE))
+                for lat, lng in points
+            ]
+
+        assert linear() == grid(), "grid index disagrees with the linear scan"
+        linear_time = timeit.timeit(linear, number=1) / args.queries
+        grid_time = timeit.timeit(grid, number=5) / 5 / args.queries
+        print(
+            f"{count:>8} {linear_time * 1e3:>11.3f} ms {grid_time * 1e6:>11.1f} us"
+            f" {build * 1e3:>7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Microbenchmark of get_current_user with and without the verified-token cache.
+
+    python -m benchmarks.token_cache --iterations 20000
+"""
+
+import argparse
+import os
+import timeit
+from datetime import timedelta
+
+os.environ.setdefault("DB_URL_STRING", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from app.api.auth import get_current_user
+from app.services import token_cache
+from app.utils import create_access_token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = create_access_token(
+        "student@bench.local", "student", "student", "BENCH00001", timedelta(minutes=20)
+    )
+    maxsize = token_cache.maxsize
+
+    token_cache.maxsize = 0
+    uncached = timeit.timeit(lambda: get_current_user(token), number=args.iterations)
+
+    token_cache.maxsize = maxsize or 10000
+    get_current_user(token)
+    cached = timeit.timeit(lambda: get_current_user(token), number=args.iterations)
+
+    for label, total in [("jwt.decode every call", uncached), ("token cache", cached)]:
+        print(f"{label:<22} {total / args.iterations * 1e6:8.2f} us/call")
+    print(f"speedup                {uncached / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()